@@ -0,0 +1,295 @@
+"""
+Load test for the API, driving `server.app` in process over ASGI.
+
+    python benchmarks/bench_api.py [--users 2000] [--requests 300] [--concurrency 16]
+                                   [--save-baseline | --check-baseline]
+
+Seeds a throwaway database (--db-name, dropped first) on MONGO_URL with
+users, swipes, matches and messages, then reports p50/p95/p99 latency and
+throughput for discover, matches, likes-me and messages, plus the most
+MongoDB round trips any single request made (from X-Mongo-Round-Trips).
+Exits non-zero when an endpoint goes over its ROUND_TRIP_BUDGETS entry.
+
+--save-baseline writes the results to --baseline; --check-baseline compares
+against it and exits non-zero when any endpoint's p95 is more than
+--tolerance slower or makes more round trips. It needs a real mongod:
+round trips are counted from driver command events, and the hot paths use
+aggregation and update features in-memory stand-ins do not implement.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+import mongo_monitor  # noqa: E402
+from ranking import interest_bits  # noqa: E402
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "api.json"
+ENDPOINTS = ["discover", "matches", "likes-me", "messages"]
+# Most MongoDB commands one request may issue once caches are warm
+ROUND_TRIP_BUDGETS = {"matches": 2, "likes-me": 2, "messages": 3}
+INTERESTS = ["السفر", "التصوير", "القراءة", "البرمجة", "الرياضة", "الموسيقى", "travel", "music", "books", "coffee"]
+CITIES = ["دبي", "الرياض", "القاهرة", "عمّان", "الدوحة", "Berlin", "London"]
+
+
+def load_server(args):
+    os.environ['DB_NAME'] = args.db_name
+    os.environ['MONGO_DEBUG_HEADERS'] = 'true'
+    os.environ.setdefault('MONGO_URL', "mongodb://localhost:27017")
+    import server
+    return server
+
+
+async def seed(db, args, password_hash: str) -> dict:
+    rng = random.Random(args.seed)
+    now = datetime.now(timezone.utc)
+
+    users = []
+    for i in range(args.users):
+        interests = rng.sample(INTERESTS, rng.randint(0, 6))
+        users.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "email": f"bench{i}@pizoo.test",
+            "password": password_hash,
+            "name": f"مستخدم {i}",
+            "age": rng.randint(18, 60),
+            "gender": rng.choice(["male", "female"]),
+            "bio": "أحب السفر والتصوير",
+            "location": rng.choice(CITIES),
+            "photos": [f"https://images.example.com/{i}/{n}.jpg" for n in range(rng.randint(1, 4))],
+            "interests": interests,
+            "interest_bits": interest_bits(interests),
+            "verified": rng.random() < 0.3,
+            "online": False,
+            "last_active": now - timedelta(minutes=rng.randint(0, 60 * 24 * 30)),
+            "created_at": now - timedelta(days=rng.randint(30, 365)),
+        })
+    await db.users.insert_many(users)
+    ids = [u['id'] for u in users]
+
+    # Probe users are the ones requests are made as; everyone also likes a
+    # few of them so likes-me has something to return
+    probes = ids[:args.probe_users]
+    swipes = []
+    for user_id in ids:
+        targets = set(rng.sample(ids, args.swipes_per_user)) | set(rng.sample(probes, min(5, len(probes))))
+        for target in targets:
+            if target != user_id:
+                swipes.append({
+                    "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "from_user_id": user_id,
+                    "to_user_id": target,
+                    "action": "like" if target in probes or rng.random() < 0.6 else "pass",
+                    "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 30)),
+                })
+    for i in range(0, len(swipes), 10000):
+        await db.swipes.insert_many(swipes[i:i + 10000])
+
+    matches, messages = [], []
+    for user_id in probes:
+        for other_id in rng.sample(ids[args.probe_users:], args.matches_per_user):
+            match_id = str(uuid.UUID(int=rng.getrandbits(128)))
+            created_at = now - timedelta(days=rng.randint(1, 30))
+            match = {
+                "id": match_id,
+                "user1_id": user_id,
+                "user2_id": other_id,
+                "pair_key": "|".join(sorted((user_id, other_id))),
+                "created_at": created_at,
+                "last_activity_at": created_at,
+                "last_message": None,
+                "unread": {user_id: 0, other_id: 0},
+            }
+            for n in range(args.messages_per_match):
+                message = {
+                    "id": str(uuid.UUID(int=rng.getrandbits(128))),
+                    "match_id": match_id,
+                    "sender_id": rng.choice((user_id, other_id)),
+                    "content": rng.choice(["مرحبا! كيف حالك؟", "Hey, how was your day?", "😊", "نلتقي غداً؟"]),
+                    "read": False,
+                    "created_at": created_at + timedelta(minutes=n * 7),
+                }
+                messages.append(message)
+                match['last_message'] = {k: message[k] for k in ("id", "sender_id", "content", "created_at")}
+                match['last_activity_at'] = message['created_at']
+            matches.append(match)
+    if matches:
+        await db.matches.insert_many(matches)
+    for i in range(0, len(messages), 10000):
+        await db.messages.insert_many(messages[i:i + 10000])
+
+    matches_by_user = {}
+    for match in matches:
+        matches_by_user.setdefault(match['user1_id'], []).append(match['id'])
+    return {"probes": probes, "matches_by_user": matches_by_user,
+            "counts": {"users": len(users), "swipes": len(swipes), "matches": len(matches), "messages": len(messages)}}
+
+
+def request_for(endpoint: str, user_id: str, data: dict, rng: random.Random) -> str:
+    if endpoint == "discover":
+        return "/api/users/discover"
+    if endpoint == "matches":
+        return "/api/matches"
+    if endpoint == "likes-me":
+        return "/api/swipes/likes-me"
+    return f"/api/messages/{rng.choice(data['matches_by_user'][user_id])}"
+
+
+async def run_endpoint(client, endpoint: str, tokens: dict, data: dict, args) -> dict:
+    rng = random.Random(args.seed)
+    users = [u for u in data['probes'] if endpoint != "messages" or data['matches_by_user'].get(u)]
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, errors, round_trips = [], 0, 0
+
+    async def one(user_id):
+        nonlocal errors, round_trips
+        path = request_for(endpoint, user_id, data, rng)
+        async with semaphore:
+            start = time.perf_counter()
+            response = await client.get(path, headers={"Authorization": f"Bearer {tokens[user_id]}"})
+            elapsed = (time.perf_counter() - start) * 1000
+        if response.status_code == 200:
+            latencies.append(elapsed)
+            round_trips = max(round_trips, mongo_monitor.round_trips(response))
+        else:
+            errors += 1
+
+    # Warm-up: first discover builds each deck, first reads fill the caches
+    await asyncio.gather(*(one(u) for u in users))
+    latencies.clear()
+    errors = round_trips = 0
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(rng.choice(users)) for _ in range(args.requests)))
+    wall = time.perf_counter() - started
+
+    if not latencies:
+        return {"p50": None, "p95": None, "p99": None, "rps": 0.0, "errors": errors, "round_trips": None}
+    latencies.sort()
+
+    def percentile(q):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * q))]
+
+    return {
+        "p50": statistics.median(latencies),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "rps": len(latencies) / wall,
+        "errors": errors,
+        "round_trips": round_trips,
+    }
+
+
+def ms(value) -> str:
+    return f"{value:8.2f} ms" if value is not None else "     n/a   "
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    for endpoint, result in results.items():
+        base = baseline.get("results", {}).get(endpoint)
+        if base and base['p95'] is not None and (result['p95'] is None or result['p95'] > base['p95'] * (1 + tolerance)):
+            regressions.append(f"{endpoint}: p95 {ms(result['p95']).strip()} vs baseline {ms(base['p95']).strip()}")
+        if base and base.get('round_trips') is not None and (result['round_trips'] or 0) > base['round_trips']:
+            regressions.append(f"{endpoint}: {result['round_trips']} round trips vs baseline {base['round_trips']}")
+    return regressions
+
+
+def over_budget(results: dict) -> list:
+    return [f"{endpoint}: {result['round_trips']} round trips, budget {ROUND_TRIP_BUDGETS[endpoint]}"
+            for endpoint, result in results.items()
+            if endpoint in ROUND_TRIP_BUDGETS and (result['round_trips'] or 0) > ROUND_TRIP_BUDGETS[endpoint]]
+
+
+async def main_async(args) -> int:
+    server = load_server(args)
+    import bcrypt
+    import httpx
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    db = server.db
+    await server.client.drop_database(args.db_name)
+    password_hash = bcrypt.hashpw(b"bench", bcrypt.gensalt(rounds=4)).decode('utf-8')
+    print(f"Seeding {args.db_name}...")
+    data = await seed(db, args, password_hash)
+    print("   " + ", ".join(f"{count} {name}" for name, count in data['counts'].items()))
+    tokens = {user_id: server.create_token(user_id) for user_id in data['probes']}
+
+    results = {}
+    async with server.app.router.lifespan_context(server.app):
+        # Server errors are counted per endpoint instead of aborting the run
+        transport = httpx.ASGITransport(app=server.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            print(f"{args.requests} requests per endpoint, concurrency {args.concurrency}")
+            for endpoint in args.endpoints:
+                result = await run_endpoint(client, endpoint, tokens, data, args)
+                results[endpoint] = result
+                print(f"{endpoint:<10} p50 {ms(result['p50'])}   p95 {ms(result['p95'])}   "
+                      f"p99 {ms(result['p99'])}   {result['rps']:8.1f} req/s   {result['errors']} errors   "
+                      f"{result['round_trips']} round trips")
+    if not args.keep:
+        await server.client.drop_database(args.db_name)
+
+    status = 1 if any(r['errors'] for r in results.values()) else 0
+    for line in over_budget(results):
+        print(f"❌ {line}")
+        status = 1
+
+    config = {k: getattr(args, k) for k in ("users", "swipes_per_user", "probe_users", "matches_per_user",
+                                            "messages_per_match", "requests", "concurrency")}
+    if args.save_baseline:
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        args.baseline.write_text(json.dumps({"config": config, "results": results}, indent=2) + "\n")
+        print(f"✅ Baseline saved to {args.baseline}")
+    if args.check_baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("config") != config:
+            print("⚠️  Baseline was recorded with different settings")
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"❌ {line}")
+        if regressions:
+            return 1
+        print(f"✅ Within {args.tolerance:.0%} of baseline p95")
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--swipes-per-user", type=int, default=30)
+    parser.add_argument("--probe-users", type=int, default=50, help="users the requests are made as")
+    parser.add_argument("--matches-per-user", type=int, default=20)
+    parser.add_argument("--messages-per-match", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--endpoints", type=lambda s: s.split(","), default=ENDPOINTS)
+    parser.add_argument("--db-name", default="pizoo_bench")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="keep the seeded database afterwards")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--check-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+    if args.probe_users > args.users or args.matches_per_user > args.users - args.probe_users:
+        parser.error("--users is too small for --probe-users and --matches-per-user")
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
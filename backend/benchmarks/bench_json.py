@@ -0,0 +1,151 @@
+"""
+Benchmark for response serialization: FastAPI's default path (jsonable_encoder
+then JSONResponse) against FastJSONResponse, on a 100-card discover payload
+and a 1000-message history. Timestamps are aware UTC datetimes with bson's
+tzinfo, as the tz-aware Motor client decodes BSON dates; --iso-strings uses
+the ISO strings stored before timestamps were migrated instead.
+
+    python benchmarks/bench_json.py [--repeat 200] [--iso-strings] [--min-speedup 2]
+
+Exits non-zero when the fast path is not at least `--min-speedup` times
+faster on either payload.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from bson.tz_util import utc
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from responses import FastJSONResponse  # noqa: E402
+
+INTERESTS = ["السفر", "التصوير", "القراءة", "البرمجة", "الرياضة", "الموسيقى", "travel", "music", "books", "coffee"]
+CITIES = ["دبي، الإمارات", "الرياض، السعودية", "Cairo, Egypt", "عمّان، الأردن", "Doha, Qatar"]
+
+
+def bson_datetime(value: datetime) -> datetime:
+    # What pymongo returns for a BSON date with tz_aware=True
+    return value.astimezone(utc)
+
+
+def make_cards(count: int, iso_strings: bool, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+
+    def stamp(minutes):
+        value = now - timedelta(minutes=minutes)
+        return value.isoformat() if iso_strings else bson_datetime(value)
+
+    return [
+        {
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "email": f"user{i}@demo.com",
+            "name": f"مستخدم {i}",
+            "age": rng.randint(18, 60),
+            "gender": rng.choice(["male", "female"]),
+            "bio": "أحب السفر والتصوير واكتشاف أماكن جديدة " * 2,
+            "location": rng.choice(CITIES),
+            "geo": {"type": "Point", "coordinates": [rng.uniform(30, 56), rng.uniform(20, 31)]},
+            "photos": [f"https://images.example.com/{i}/{n}.jpg" for n in range(rng.randint(1, 6))],
+            "interests": rng.sample(INTERESTS, rng.randint(0, 6)),
+            "verified": rng.random() < 0.3,
+            "height": "170",
+            "education": "بكالوريوس",
+            "work": "مهندس",
+            "smoking": "no",
+            "drinking": "no",
+            "children": "",
+            "online": rng.random() < 0.2,
+            "last_active": stamp(rng.randint(0, 60 * 24 * 30)),
+            "created_at": stamp(rng.randint(60 * 24 * 30, 60 * 24 * 365)),
+        }
+        for i in range(count)
+    ]
+
+
+def make_messages(count: int, iso_strings: bool, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    senders = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(2)]
+    match_id = str(uuid.UUID(int=rng.getrandbits(128)))
+    messages = []
+    for i in range(count):
+        created_at = start + timedelta(seconds=i * 37)
+        messages.append({
+            "id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "match_id": match_id,
+            "sender_id": senders[i % 2],
+            "content": rng.choice(["مرحبا! كيف حالك؟", "Hey, how was your day?", "😊", "نلتقي غداً؟"]),
+            "read": True,
+            "created_at": created_at.isoformat() if iso_strings else bson_datetime(created_at),
+        })
+    return messages
+
+
+def default_path(content) -> bytes:
+    return JSONResponse(jsonable_encoder(content)).body
+
+
+def fast_path(content) -> bytes:
+    return FastJSONResponse(content).body
+
+
+def timed(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name: str, samples: list) -> float:
+    samples = sorted(samples)
+    p50 = statistics.median(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{name:<36} p50 {p50:8.3f} ms   p95 {p95:8.3f} ms")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--iso-strings", action="store_true",
+                        help="use ISO string timestamps, as stored before the datetime migration")
+    parser.add_argument("--min-speedup", type=float, default=2.0)
+    args = parser.parse_args()
+
+    payloads = {
+        "discover (100 cards)": make_cards(100, args.iso_strings),
+        "messages (1000)": make_messages(1000, args.iso_strings),
+    }
+
+    print(f"Serializing responses, {args.repeat} runs, "
+          f"{'ISO string' if args.iso_strings else 'BSON datetime'} timestamps")
+    failed = False
+    for name, content in payloads.items():
+        slow = report(f"{name} default", timed(lambda: default_path(content), args.repeat))
+        fast = report(f"{name} fast", timed(lambda: fast_path(content), args.repeat))
+        speedup = slow / fast if fast else float("inf")
+        print(f"{'':<36} {speedup:.1f}x faster, {len(fast_path(content)) / 1024:.0f} KiB")
+        if speedup < args.min_speedup:
+            failed = True
+
+    if failed:
+        print(f"❌ fast path is less than {args.min_speedup}x faster")
+        return 1
+    print(f"✅ fast path at least {args.min_speedup}x faster")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
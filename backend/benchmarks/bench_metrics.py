@@ -0,0 +1,101 @@
+"""
+Microbenchmark for the request metrics middleware.
+
+    python benchmarks/bench_metrics.py [--requests 20000] [--budget-us 20]
+
+Calls a small FastAPI app directly over ASGI, with and without
+MetricsMiddleware, and reports the added cost per request and the time to
+render /metrics. Exits non-zero when the median overhead exceeds the budget.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fastapi import FastAPI  # noqa: E402
+
+from metrics import MetricsMiddleware, RequestMetrics  # noqa: E402
+
+PATHS = ["/api/users/discover", "/api/matches", "/api/messages/{match_id}", "/api/users/{user_id}"]
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+    for path in PATHS:
+        async def endpoint():
+            return {"ok": True}
+        app.add_api_route(path, endpoint, methods=["GET"])
+    return app
+
+
+def concrete(path: str, i: int) -> str:
+    return path.replace("{match_id}", f"m-{i}").replace("{user_id}", f"u-{i}")
+
+
+async def drive(app, count: int) -> float:
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for i in range(count):
+        path = concrete(PATHS[i % len(PATHS)], i)
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+            "query_string": b"", "headers": [], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+        }
+        await app(scope, receive, send)
+    return (time.perf_counter() - start) / count * 1e6
+
+
+async def run(args):
+    plain = make_app()
+    metrics = RequestMetrics()
+    measured = make_app()
+    measured.add_middleware(MetricsMiddleware, metrics=metrics)
+
+    # Build both middleware stacks before timing
+    await drive(plain, 100)
+    await drive(measured, 100)
+
+    base, with_metrics = [], []
+    for _ in range(args.rounds):
+        base.append(await drive(plain, args.requests // args.rounds))
+        with_metrics.append(await drive(measured, args.requests // args.rounds))
+
+    start = time.perf_counter()
+    body = metrics.render({"example_gauge": 1})
+    render_ms = (time.perf_counter() - start) * 1000
+
+    overhead = statistics.median(w - b for w, b in zip(with_metrics, base))
+    print(f"{args.requests} requests over {len(PATHS)} routes, {args.rounds} rounds")
+    print(f"{'without metrics':<24} {statistics.median(base):8.2f} us/request")
+    print(f"{'with metrics':<24} {statistics.median(with_metrics):8.2f} us/request")
+    print(f"{'overhead':<24} {overhead:8.2f} us/request")
+    print(f"{'render /metrics':<24} {render_ms:8.2f} ms ({len(body)} bytes)")
+
+    if overhead > args.budget_us:
+        print(f"❌ overhead exceeds {args.budget_us} us budget")
+        return 1
+    print(f"✅ overhead within {args.budget_us} us budget")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--budget-us", type=float, default=20.0)
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,92 @@
+"""
+Benchmark for the discovery ranking engine.
+
+    python benchmarks/bench_ranking.py [--candidates 10000] [--budget-ms 5]
+
+Candidates look like the documents decks read with RANKING_PROJECTION:
+stored interest_bits and last_active in epoch milliseconds. Exits non-zero when the median time for rank_candidates,
+from those documents to the ranked top 200, exceeds the budget.
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ranking import CandidateBatch, interest_bits, rank_candidates, score_batch  # noqa: E402
+
+INTERESTS = [
+    "السفر", "التصوير", "القراءة", "البرمجة", "الرياضة", "الموسيقى", "الفن", "الكتابة",
+    "السينما", "الطب", "السباحة", "التصميم", "الموضة", "travel", "music", "books",
+    "photography", "cooking", "hiking", "gaming", "yoga", "coffee", "dancing", "football",
+]
+
+
+def make_users(count: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    now = int(datetime.now(timezone.utc).timestamp() * 1000)
+    users = []
+    for i in range(count):
+        interests = rng.sample(INTERESTS, rng.randint(0, 6))
+        users.append({
+            "id": f"user-{i}",
+            "age": rng.randint(18, 60),
+            "interests": interests,
+            "interest_bits": interest_bits(interests),
+            "last_active": now - rng.randint(0, 60 * 24 * 30) * 60000,
+        })
+    return users
+
+
+def timed(fn, repeat: int) -> list:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name: str, samples: list):
+    samples = sorted(samples)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    print(f"{name:<28} p50 {statistics.median(samples):8.3f} ms   p95 {p95:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    users = make_users(args.candidates + 1)
+    me, candidates = users[0], users[1:]
+    batch = CandidateBatch(candidates)
+    # Documents from before interest_bits, with BSON dates
+    legacy = [
+        {**{k: v for k, v in user.items() if k != "interest_bits"},
+         "last_active": datetime.fromtimestamp(user['last_active'] / 1000, timezone.utc)}
+        for user in candidates
+    ]
+
+    print(f"Ranking {args.candidates} candidates, {args.repeat} runs")
+    report("score_batch", timed(lambda: score_batch(me, batch), args.repeat))
+    report("CandidateBatch", timed(lambda: CandidateBatch(candidates), args.repeat))
+    ranking = timed(lambda: rank_candidates(me, candidates, 200), args.repeat)
+    report("rank_candidates (top 200)", ranking)
+    report("  legacy documents", timed(lambda: rank_candidates(me, legacy, 200), max(args.repeat // 10, 3)))
+
+    if statistics.median(ranking) > args.budget_ms:
+        print(f"❌ rank_candidates median exceeds {args.budget_ms} ms budget")
+        return 1
+    print(f"✅ rank_candidates within {args.budget_ms} ms budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
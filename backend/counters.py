@@ -0,0 +1,218 @@
+import asyncio
+import os
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+
+# Denormalized unread state:
+#   counters: {user_id, notifications: <unread notifications>}
+#   matches:  {..., unread: {<member id>: <unread messages from the other member>},
+#                   read_at: {<member id>: <created_at of the last message they read>},
+#                   last_message: {id, sender_id, content, created_at},
+#                   last_activity_at: <created_at of the last message, or of the match>}
+# A message is read once its recipient's watermark reaches it, so opening a
+# conversation is one update to the match instead of one per message.
+# Handlers keep them current with atomic updates; reconcile_counters()
+# recomputes everything from source to repair any drift.
+
+
+def _timestamp(value):
+    # Messages written before the datetime migration carry ISO strings
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime) and value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value if isinstance(value, datetime) else None
+
+
+async def add_unread_notifications(db, docs: list):
+    counts = Counter(doc['user_id'] for doc in docs if not doc.get('read'))
+    if not counts:
+        return
+    await db.counters.bulk_write([
+        UpdateOne({"user_id": user_id}, {"$inc": {"notifications": count}}, upsert=True)
+        for user_id, count in counts.items()
+    ], ordered=False)
+
+
+async def get_unread_notifications(db, user_id: str) -> int:
+    doc = await db.counters.find_one({"user_id": user_id}, {"_id": 0, "notifications": 1})
+    return max((doc or {}).get('notifications', 0), 0)
+
+
+async def read_notification(db, user_id: str, notification_id: str):
+    result = await db.notifications.update_one(
+        {"id": notification_id, "user_id": user_id, "read": False},
+        {"$set": {"read": True}}
+    )
+    if result.modified_count:
+        await db.counters.update_one(
+            {"user_id": user_id, "notifications": {"$gt": 0}},
+            {"$inc": {"notifications": -1}}
+        )
+
+
+async def read_all_notifications(db, user_id: str):
+    await db.notifications.update_many(
+        {"user_id": user_id, "read": False},
+        {"$set": {"read": True}}
+    )
+    await db.counters.update_one(
+        {"user_id": user_id},
+        {"$set": {"notifications": 0}},
+        upsert=True
+    )
+
+
+async def add_message(db, message: dict, recipient_id: str):
+    """Count the message as unread for the recipient and make it the match's last message."""
+    created_at = message['created_at']
+    snapshot = {field: message[field] for field in ("id", "sender_id", "content", "created_at")}
+    # Pipeline form so a slower, older send can't overwrite a newer snapshot
+    await db.matches.update_one({"id": message['match_id']}, [{"$set": {
+        f"unread.{recipient_id}": {"$add": [{"$ifNull": [f"$unread.{recipient_id}", 0]}, 1]},
+        "last_message": {"$cond": [
+            {"$gt": [created_at, {"$ifNull": ["$last_activity_at", None]}]},
+            {"$literal": snapshot},
+            "$last_message"
+        ]},
+        "last_activity_at": {"$max": ["$last_activity_at", created_at]}
+    }}])
+
+
+async def mark_messages_read(db, match: dict, user_id: str, read_up_to):
+    """
+    Advance the member's watermark to `read_up_to`. Their unread count is
+    cleared only when nothing in the match is newer; after an older page, or
+    when a message landed meanwhile, it is recounted past the watermark.
+    """
+    read_up_to = _timestamp(read_up_to)
+    if read_up_to is None:
+        return
+    read_at = match.setdefault('read_at', {})
+    unread = match.setdefault('unread', {})
+    current = _timestamp(read_at.get(user_id))
+    # Skip the write when there is nothing to clear
+    if not unread.get(user_id) and current is not None and current >= read_up_to:
+        return
+    updated = await db.matches.find_one_and_update({"id": match['id']}, [{"$set": {
+        f"read_at.{user_id}": {"$max": [f"$read_at.{user_id}", read_up_to]},
+        f"unread.{user_id}": {"$cond": [
+            {"$gte": [read_up_to, {"$ifNull": ["$last_activity_at", read_up_to]}]},
+            0,
+            {"$ifNull": [f"$unread.{user_id}", 0]}
+        ]}
+    }}], projection={"_id": 0, "read_at": 1, "unread": 1, "last_activity_at": 1},
+        return_document=ReturnDocument.AFTER)
+    if updated is None:
+        return
+    watermark = _timestamp(updated['read_at'][user_id])
+    read_at[user_id] = watermark
+    unread[user_id] = count = updated.get('unread', {}).get(user_id, 0)
+    if not count:
+        return
+
+    other_id = match['user2_id'] if user_id == match['user1_id'] else match['user1_id']
+    recount = await db.messages.count_documents({
+        "match_id": match['id'], "sender_id": other_id, "read": {"$ne": True}, "created_at": {"$gt": watermark}
+    })
+    if recount != count:
+        # Lose to any add_message that ran since; its count is the safer one
+        result = await db.matches.update_one(
+            {"id": match['id'], f"unread.{user_id}": count},
+            {"$set": {f"unread.{user_id}": recount}}
+        )
+        if result.modified_count:
+            unread[user_id] = recount
+
+
+def apply_read_state(match: dict, messages: list) -> list:
+    """Set each message's `read` flag from its recipient's watermark."""
+    members = (match['user1_id'], match['user2_id'])
+    watermarks = {user_id: _timestamp(match.get('read_at', {}).get(user_id)) for user_id in members}
+    for message in messages:
+        recipient = members[1] if message['sender_id'] == members[0] else members[0]
+        read_at = watermarks[recipient]
+        created_at = _timestamp(message.get('created_at'))
+        # Stored flags come from before watermarks existed
+        message['read'] = bool(message.get('read')) or (
+            read_at is not None and created_at is not None and created_at <= read_at
+        )
+    return messages
+
+
+async def reconcile_counters(db, batch_size: int = 1000) -> dict:
+    """Recompute unread counters and match summaries from notifications and messages."""
+    notification_counts = {
+        row['_id']: row['count']
+        async for row in db.notifications.aggregate([
+            {"$match": {"read": False}},
+            {"$group": {"_id": "$user_id", "count": {"$sum": 1}}}
+        ])
+    }
+    operations = []
+    async for doc in db.counters.find({}, {"_id": 0, "user_id": 1, "notifications": 1}):
+        count = notification_counts.pop(doc['user_id'], 0)
+        if doc.get('notifications') != count:
+            operations.append(UpdateOne({"user_id": doc['user_id']}, {"$set": {"notifications": count}}))
+    operations.extend(
+        UpdateOne({"user_id": user_id}, {"$set": {"notifications": count}}, upsert=True)
+        for user_id, count in notification_counts.items()
+    )
+    users_updated = len(operations)
+    for i in range(0, len(operations), batch_size):
+        await db.counters.bulk_write(operations[i:i + batch_size], ordered=False)
+
+    operations = []
+    matches_updated = 0
+    async for match in db.matches.find({}, {"_id": 0, "id": 1, "user1_id": 1, "user2_id": 1, "read_at": 1, "created_at": 1}):
+        unread = {}
+        for member, sender in ((match['user1_id'], match['user2_id']), (match['user2_id'], match['user1_id'])):
+            query = {"match_id": match['id'], "sender_id": sender, "read": {"$ne": True}}
+            read_at = _timestamp(match.get('read_at', {}).get(member))
+            if read_at is not None:
+                query["created_at"] = {"$gt": read_at}
+            unread[member] = await db.messages.count_documents(query)
+        update = {"unread": unread, "last_message": None, "last_activity_at": _timestamp(match.get('created_at'))}
+        last = await db.messages.find_one(
+            {"match_id": match['id']},
+            {"_id": 0, "id": 1, "sender_id": 1, "content": 1, "created_at": 1},
+            sort=[("created_at", -1), ("id", -1)]
+        )
+        if last:
+            last['created_at'] = _timestamp(last['created_at'])
+            update["last_message"] = last
+            update["last_activity_at"] = last['created_at']
+        operations.append(UpdateOne({"id": match['id']}, {"$set": update}))
+        if len(operations) >= batch_size:
+            await db.matches.bulk_write(operations, ordered=False)
+            matches_updated += len(operations)
+            operations = []
+    if operations:
+        await db.matches.bulk_write(operations, ordered=False)
+        matches_updated += len(operations)
+
+    return {"users": users_updated, "matches": matches_updated}
+
+
+async def main():
+    ROOT_DIR = Path(__file__).parent
+    load_dotenv(ROOT_DIR / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        result = await reconcile_counters(db)
+        print(f"✅ Reconciled unread counters for {result['users']} users and summaries for {result['matches']} matches")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
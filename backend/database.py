@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import threading
+import time
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """
+    pymongo connection pool listener, registered on the client with
+    `event_listeners=[...]`. Tracks per server: open connections, how many
+    are checked out, and how many operations are waiting for one, plus
+    checkout wait time and failures. Events fire on the driver's threads.
+    """
+
+    def __init__(self, max_pool_size: int):
+        self.max_pool_size = max_pool_size
+        self._lock = threading.Lock()
+        self._pools = {}
+        self._waiting_since = threading.local()
+
+    def _pool(self, address) -> dict:
+        key = "%s:%s" % address
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = {
+                "connections": 0, "checked_out": 0, "wait_queue": 0,
+                "checkouts": 0, "checkout_failures": 0, "wait_seconds": 0.0, "max_wait_seconds": 0.0,
+            }
+        return pool
+
+    def pool_created(self, event):
+        with self._lock:
+            self._pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop("%s:%s" % event.address, None)
+
+    def connection_created(self, event):
+        with self._lock:
+            self._pool(event.address)["connections"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["connections"] = max(0, pool["connections"] - 1)
+
+    def connection_check_out_started(self, event):
+        # Started and checked-out/failed fire on the same thread
+        self._waiting_since.value = time.monotonic()
+        with self._lock:
+            self._pool(event.address)["wait_queue"] += 1
+
+    def _waited(self) -> float:
+        started = getattr(self._waiting_since, "value", None)
+        self._waiting_since.value = None
+        return time.monotonic() - started if started is not None else 0.0
+
+    def connection_check_out_failed(self, event):
+        self._waited()
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["wait_queue"] = max(0, pool["wait_queue"] - 1)
+            pool["checkout_failures"] += 1
+
+    def connection_checked_out(self, event):
+        waited = self._waited()
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["wait_queue"] = max(0, pool["wait_queue"] - 1)
+            pool["checked_out"] += 1
+            pool["checkouts"] += 1
+            pool["wait_seconds"] += waited
+            pool["max_wait_seconds"] = max(pool["max_wait_seconds"], waited)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            pool = self._pool(event.address)
+            pool["checked_out"] = max(0, pool["checked_out"] - 1)
+
+    def stats(self) -> dict:
+        """Server address -> pool counters, with saturation (checked out / max pool size)."""
+        with self._lock:
+            pools = {address: dict(pool) for address, pool in self._pools.items()}
+        for pool in pools.values():
+            pool["max_pool_size"] = self.max_pool_size
+            pool["saturation"] = round(pool["checked_out"] / self.max_pool_size, 3) if self.max_pool_size else 0.0
+            pool["avg_wait_ms"] = round(pool["wait_seconds"] / pool["checkouts"] * 1000, 3) if pool["checkouts"] else 0.0
+            pool["max_wait_ms"] = round(pool.pop("max_wait_seconds") * 1000, 3)
+            pool.pop("wait_seconds")
+        return pools
+
+
+async def warm_up(client, connections: int):
+    """
+    Select a server and open up to `connections` pooled connections by
+    running that many pings at once, so the first requests after startup
+    don't pay for connection setup and authentication.
+    """
+    started = time.perf_counter()
+    await client.admin.command("ping")
+    if connections > 1:
+        await asyncio.gather(*(client.admin.command("ping") for _ in range(connections)))
+    logger.info("MongoDB connection pool warmed up in %.0f ms", (time.perf_counter() - started) * 1000)
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from ranking import rank_candidates
+from seen import find_unseen_users
+
+logger = logging.getLogger(__name__)
+
+# Fields the ranking engine needs from candidates while building a deck.
+# last_active comes back as epoch milliseconds so ranking never converts
+# datetimes one by one; interests are only read for users without
+# interest_bits yet.
+RANKING_PROJECTION = {
+    "_id": 0, "id": 1, "age": 1, "interests": 1, "interest_bits": 1,
+    "last_active": {"$convert": {"input": "$last_active", "to": "long", "onError": None, "onNull": None}},
+}
+
+
+class DeckManager:
+    """
+    Per-user decks of pre-ranked candidate ids in the `decks` collection
+    ({user_id, candidates: [...], refilled_at, exhausted}). Discover serves
+    the head of the deck with one $in read of profiles; swipes pull ids off
+    the deck; background workers rebuild a deck from the seen filter and the
+    ranking engine once it runs below `refill_threshold`. A refill that finds
+    nobody marks the deck `exhausted`, and it is not rebuilt inline again
+    until `empty_cooldown` seconds have passed.
+    """
+
+    def __init__(self, db, deck_size: int = 200, refill_threshold: int = 50,
+                 pool_size: int = 500, workers: int = 2, empty_cooldown: float = 60.0):
+        self.db = db
+        self.deck_size = deck_size
+        self.refill_threshold = refill_threshold
+        self.pool_size = pool_size
+        self.empty_cooldown = timedelta(seconds=empty_cooldown)
+        self.workers = workers
+        self._queue = asyncio.Queue()
+        self._scheduled = set()
+        self._tasks = []
+
+    async def get(self, user_id: str, limit: int, projection: dict) -> list:
+        """Profiles at the head of the user's deck, in ranked order."""
+        deck = await self.db.decks.find_one(
+            {"user_id": user_id}, {"_id": 0, "candidates": 1, "refilled_at": 1, "exhausted": 1}
+        )
+        candidates = (deck or {}).get('candidates')
+        if not candidates:
+            if self._exhausted_recently(deck):
+                # Nobody left to show; don't rescan the whole pool on every request
+                return []
+            # Cold start or deck used up by swipes: build it inline once
+            candidates = await self.refill(user_id)
+        elif len(candidates) < self.refill_threshold:
+            self.schedule(user_id)
+
+        ids = candidates[:limit]
+        users = await self.db.users.find({"id": {"$in": ids}}, projection).to_list(len(ids))
+        users_by_id = {u['id']: u for u in users}
+        return [users_by_id[i] for i in ids if i in users_by_id]
+
+    def _exhausted_recently(self, deck: dict) -> bool:
+        # Decks emptied by swipes aren't exhausted; only a refill that found
+        # nobody is
+        if not (deck or {}).get('exhausted'):
+            return False
+        refilled_at = deck.get('refilled_at')
+        if refilled_at is None:
+            return False
+        if refilled_at.tzinfo is None:
+            refilled_at = refilled_at.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - refilled_at < self.empty_cooldown
+
+    async def consume(self, user_id: str, target_ids: list):
+        await self.db.decks.update_one(
+            {"user_id": user_id},
+            {"$pullAll": {"candidates": target_ids}}
+        )
+
+    def schedule(self, user_id: str):
+        if user_id not in self._scheduled:
+            self._scheduled.add(user_id)
+            self._queue.put_nowait(user_id)
+
+    async def refill(self, user_id: str) -> list:
+        # BSON dates keep milliseconds, so compare at that precision
+        started_at = datetime.now(timezone.utc)
+        started_at = started_at.replace(microsecond=started_at.microsecond // 1000 * 1000)
+        user = await self.db.users.find_one({"id": user_id}, RANKING_PROJECTION)
+        if not user:
+            return []
+        pool = await find_unseen_users(self.db, user_id, self.pool_size, RANKING_PROJECTION)
+        ranked = [c['id'] for c in rank_candidates(user, pool, self.deck_size)]
+
+        # Drop anyone swiped while the deck was being built
+        recent = await self.db.swipes.find(
+            {"from_user_id": user_id, "created_at": {"$gte": started_at}},
+            {"_id": 0, "to_user_id": 1}
+        ).to_list(None)
+        swiped = {s['to_user_id'] for s in recent}
+        ranked = [i for i in ranked if i not in swiped]
+
+        await self.db.decks.update_one(
+            {"user_id": user_id},
+            {"$set": {"candidates": ranked, "refilled_at": datetime.now(timezone.utc), "exhausted": not ranked}},
+            upsert=True
+        )
+        return ranked
+
+    async def _worker(self):
+        while True:
+            user_id = await self._queue.get()
+            try:
+                await self.refill(user_id)
+            except Exception:
+                logger.exception("Deck refill failed for user %s", user_id)
+            finally:
+                self._scheduled.discard(user_id)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -0,0 +1,124 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+ROOT_DIR = Path(__file__).parent
+CITIES_FILE = ROOT_DIR / 'data' / 'cities.json'
+
+# Everyone in a city would otherwise share its centroid, so distances from it
+# would all tie. A user's point is moved up to JITTER_METERS from the centroid,
+# in a direction and by a distance derived from their id, so nearby can page
+# in $geoNear's own distance order.
+JITTER_METERS = 1000.0
+METERS_PER_DEGREE = 111320.0
+
+
+def normalize_place(text: str) -> str:
+    """Fold case, accents, Arabic diacritics and letter variants for lookups."""
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.replace('ـ', '').replace('ى', 'ي').replace('ة', 'ه').replace('،', ',')
+    text = re.sub(r'\s*,\s*', ', ', text.casefold())
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+@lru_cache(maxsize=1)
+def _city_index() -> dict:
+    with open(CITIES_FILE, encoding='utf-8') as f:
+        cities = json.load(f)
+    index = {}
+    for city in cities:
+        point = {"type": "Point", "coordinates": [city['lon'], city['lat']]}
+        for name in [city['name'], *city.get('aliases', [])]:
+            index.setdefault(normalize_place(name), point)
+    return index
+
+
+def _jitter(point: dict, user_id: str) -> dict:
+    digest = hashlib.blake2b(user_id.encode('utf-8'), digest_size=8).digest()
+    angle = int.from_bytes(digest[:4], 'little') / 2 ** 32 * 2 * math.pi
+    # sqrt spreads points evenly over the disc instead of bunching at the centre
+    radius = JITTER_METERS * math.sqrt(int.from_bytes(digest[4:], 'little') / 2 ** 32)
+    lon, lat = point['coordinates']
+    lat_scale = max(math.cos(math.radians(lat)), 0.01)
+    lat = min(max(lat + radius * math.cos(angle) / METERS_PER_DEGREE, -90.0), 90.0)
+    lon = (lon + radius * math.sin(angle) / (METERS_PER_DEGREE * lat_scale) + 180.0) % 360.0 - 180.0
+    return {"type": "Point", "coordinates": [lon, lat]}
+
+
+def geocode(location: str, user_id: str = None) -> Optional[dict]:
+    """
+    Resolve a free-text location such as "دبي، الإمارات" or "Cairo, Egypt" to
+    a GeoJSON point using the bundled city table. Tries the whole string,
+    then the part before the first comma. Returns None when unknown. With
+    `user_id` the point is that user's stable spot near the city centre.
+    """
+    if not location:
+        return None
+    index = _city_index()
+    normalized = normalize_place(location)
+    point = index.get(normalized) or index.get(normalized.split(',')[0].strip())
+    if point is None or user_id is None:
+        return point
+    return _jitter(point, user_id)
+
+
+async def backfill_geo(db, batch_size: int = 500, everyone: bool = False) -> Counter:
+    """
+    Set `geo` on users that have none, in id order so reruns resume cheaply.
+    `everyone` recomputes existing points too, e.g. ones stored before jitter.
+    """
+    results = Counter()
+    last_id = ""
+    while True:
+        query = {"id": {"$gt": last_id}}
+        if not everyone:
+            query["geo"] = {"$exists": False}
+        users = await db.users.find(query, {"_id": 0, "id": 1, "location": 1}).sort("id", 1).to_list(batch_size)
+        if not users:
+            return results
+        operations = []
+        for user in users:
+            point = geocode(user.get('location', ""), user['id'])
+            if point:
+                operations.append(UpdateOne({"id": user['id']}, {"$set": {"geo": point}}))
+                results['geocoded'] += 1
+            else:
+                results['unknown:' + (user.get('location') or "")] += 1
+        if operations:
+            await db.users.bulk_write(operations, ordered=False)
+        last_id = users[-1]['id']
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--all", action="store_true", help="recompute every user's point, not just missing ones")
+    args = parser.parse_args()
+
+    load_dotenv(ROOT_DIR / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        results = await backfill_geo(db, everyone=args.all)
+        print(f"✅ Geocoded {results.pop('geocoded', 0)} users")
+        for key, count in results.most_common():
+            print(f"⚠️  {count} users with unknown location {key.split(':', 1)[1]!r}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Indexes required by the routes in server.py, per collection.
+# Every index is named explicitly so repeated builds are no-ops.
+INDEXES = {
+    "users": [
+        IndexModel([("id", ASCENDING)], name="users_id", unique=True),
+        IndexModel([("email", ASCENDING)], name="users_email", unique=True),
+        IndexModel([("location", ASCENDING)], name="users_location"),
+        IndexModel([("geo", GEOSPHERE)], name="users_geo"),
+    ],
+    "swipes": [
+        IndexModel([("from_user_id", ASCENDING), ("to_user_id", ASCENDING)], name="swipes_from_to"),
+        IndexModel(
+            [("to_user_id", ASCENDING), ("action", ASCENDING), ("created_at", DESCENDING), ("id", DESCENDING)],
+            name="swipes_to_action_created",
+        ),
+    ],
+    "seen": [
+        IndexModel([("user_id", ASCENDING)], name="seen_user", unique=True),
+    ],
+    "counters": [
+        IndexModel([("user_id", ASCENDING)], name="counters_user", unique=True),
+    ],
+    "decks": [
+        IndexModel([("user_id", ASCENDING)], name="decks_user", unique=True),
+    ],
+    "pairs": [
+        IndexModel([("key", ASCENDING)], name="pairs_key", unique=True),
+    ],
+    "matches": [
+        IndexModel([("id", ASCENDING)], name="matches_id", unique=True),
+        # One per side; the $or in get_matches merges both in activity order
+        IndexModel(
+            [("user1_id", ASCENDING), ("last_activity_at", DESCENDING), ("id", DESCENDING)],
+            name="matches_user1_activity",
+        ),
+        IndexModel(
+            [("user2_id", ASCENDING), ("last_activity_at", DESCENDING), ("id", DESCENDING)],
+            name="matches_user2_activity",
+        ),
+        # Duplicates created before pair keys existed are left unkeyed
+        IndexModel(
+            [("pair_key", ASCENDING)],
+            name="matches_pair_key",
+            unique=True,
+            partialFilterExpression={"pair_key": {"$exists": True}},
+        ),
+    ],
+    "messages": [
+        IndexModel([("id", ASCENDING)], name="messages_id", unique=True),
+        IndexModel(
+            [("match_id", ASCENDING), ("created_at", ASCENDING), ("id", ASCENDING)],
+            name="messages_match_created_id",
+        ),
+    ],
+    "notifications": [
+        IndexModel([("id", ASCENDING)], name="notifications_id", unique=True),
+        IndexModel(
+            [("user_id", ASCENDING), ("read", ASCENDING), ("created_at", DESCENDING)],
+            name="notifications_user_read_created",
+        ),
+    ],
+}
+
+# Query shapes issued by each route: (route, collection, filter, sort).
+# Values are placeholders, only the shape matters for the planner.
+QUERY_SHAPES = [
+    ("get_user", "users", {"id": "u"}, None),
+    ("register", "users", {"email": "e"}, None),
+    ("discover_users", "decks", {"user_id": "u"}, None),
+    ("discover_users", "users", {"id": {"$in": ["u"]}}, None),
+    ("discover_users", "seen", {"user_id": "u"}, None),
+    ("discover_users", "users", {"id": {"$gt": "u", "$ne": "u"}}, [("id", ASCENDING)]),
+    ("discover_users", "swipes", {"from_user_id": "u", "to_user_id": {"$in": ["v"]}}, None),
+    (
+        "nearby_users",
+        "users",
+        {"geo": {"$nearSphere": {"$geometry": {"type": "Point", "coordinates": [0, 0]}, "$maxDistance": 1000}}},
+        None,
+    ),
+    ("nearby_users", "users", {"id": {"$ne": "u"}, "location": "l"}, None),
+    ("discover_users", "swipes", {"from_user_id": "u", "created_at": {"$gte": "t"}}, None),
+    ("create_swipe", "pairs", {"key": "k"}, None),
+    ("create_swipe", "matches", {"pair_key": "k"}, None),
+    ("get_likes_me", "swipes", {"to_user_id": "u", "action": "like"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    ("get_likes_me", "users", {"id": {"$in": ["u"]}}, None),
+    (
+        "get_matches",
+        "matches",
+        {"$or": [{"user1_id": "u"}, {"user2_id": "u"}]},
+        [("last_activity_at", DESCENDING), ("id", DESCENDING)],
+    ),
+    ("get_matches", "users", {"id": {"$in": ["u"]}}, None),
+    ("get_messages", "matches", {"id": "m"}, None),
+    ("get_messages", "messages", {"match_id": "m"}, [("created_at", DESCENDING), ("id", DESCENDING)]),
+    (
+        "get_messages",
+        "messages",
+        {"match_id": "m", "$or": [{"created_at": {"$lt": "t"}}, {"created_at": "t", "id": {"$lt": "i"}}]},
+        [("created_at", DESCENDING), ("id", DESCENDING)],
+    ),
+    ("get_notifications", "notifications", {"user_id": "u"}, [("created_at", DESCENDING)]),
+    ("get_unread_count", "counters", {"user_id": "u"}, None),
+    ("mark_all_notifications_read", "notifications", {"user_id": "u", "read": False}, None),
+    ("mark_notification_read", "notifications", {"id": "n", "user_id": "u"}, None),
+]
+
+
+async def ensure_indexes(db):
+    """
+    Create every declared index. Safe to run on each startup. Each index is
+    built on its own so one failure doesn't hold back the others.
+    """
+    created = []
+    for collection, models in INDEXES.items():
+        for model in models:
+            try:
+                created.extend(await db[collection].create_indexes([model]))
+            except OperationFailure as e:
+                # Usually duplicate data under a unique index; keep the app up
+                # and let check_query_plans() point at the missing index.
+                logger.error("Failed to build index %s on %s: %s", model.document["name"], collection, e)
+    return created
+
+
+def _plan_stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+
+async def check_query_plans(db):
+    """Explain every route query shape and return those whose winning plan is a COLLSCAN."""
+    failures = []
+    for route, collection, query, sort in QUERY_SHAPES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        explain = await cursor.explain()
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in set(_plan_stages(winning_plan)):
+            failures.append((route, collection, query))
+    return failures
+
+
+async def main(check: bool):
+    ROOT_DIR = Path(__file__).parent
+    load_dotenv(ROOT_DIR / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        created = await ensure_indexes(db)
+        print(f"✅ Indexes ready ({len(created)} declared)")
+        if not check:
+            return 0
+        failures = await check_query_plans(db)
+        for route, collection, query in failures:
+            print(f"❌ {route}: COLLSCAN on {collection} for {query}")
+        if failures:
+            return 1
+        print(f"✅ All {len(QUERY_SHAPES)} query shapes use an index")
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(check="--check" in sys.argv[1:])))
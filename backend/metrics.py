@@ -0,0 +1,193 @@
+import time
+from bisect import bisect_left
+
+from mongo_monitor import DURATION_HEADER, ROUND_TRIPS_HEADER, CommandStats, current_stats
+
+# Upper bounds for the latency (seconds) and response size (bytes) histograms
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 4, 6, 8, 12, 16, 32)
+
+# Requests that matched no route share one label, so stray paths can't
+# create unbounded series
+UNMATCHED = "unmatched"
+
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def lines(self, name: str, labels: str) -> list:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {cumulative}')
+        return lines
+
+
+def _route_of(scope) -> str:
+    # FastAPI puts the matched route in the scope while routing
+    route = scope.get("route")
+    return getattr(route, "path", None) or UNMATCHED
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class RequestMetrics:
+    """
+    Per-route request metrics, labelled by method and route template
+    (`/api/messages/{match_id}`, not the concrete path), rendered in the
+    Prometheus text format. In-flight requests are kept as live scopes and
+    grouped by route only when scraped, so the request path pays for two
+    dict operations rather than a route lookup.
+    """
+
+    def __init__(self):
+        self._latency = {}
+        self._sizes = {}
+        self._round_trips = {}
+        self._mongo_time = {}
+        self._requests = {}
+        self._active = {}
+
+    def start(self, scope) -> int:
+        key = id(scope)
+        self._active[key] = scope
+        return key
+
+    def finish(self, key: int, scope, status: int, size: int, elapsed: float, mongo: CommandStats = None):
+        self._active.pop(key, None)
+        series = (scope["method"], _route_of(scope))
+        latency = self._latency.get(series)
+        if latency is None:
+            latency = self._latency[series] = Histogram(LATENCY_BUCKETS)
+            self._sizes[series] = Histogram(SIZE_BUCKETS)
+            self._round_trips[series] = Histogram(ROUND_TRIP_BUCKETS)
+            self._mongo_time[series] = Histogram(LATENCY_BUCKETS)
+        latency.observe(elapsed)
+        self._sizes[series].observe(size)
+        if mongo is not None:
+            self._round_trips[series].observe(mongo.commands)
+            self._mongo_time[series].observe(mongo.duration_micros / 1e6)
+        counter = series + (status,)
+        self._requests[counter] = self._requests.get(counter, 0) + 1
+
+    def in_flight(self) -> dict:
+        counts = {}
+        for scope in list(self._active.values()):
+            series = (scope["method"], _route_of(scope))
+            counts[series] = counts.get(series, 0) + 1
+        return counts
+
+    def render(self, gauges: dict = None, mongo_commands: dict = None) -> str:
+        """
+        Prometheus text exposition; `gauges` adds unlabelled name -> value
+        samples and `mongo_commands` per-command totals from CommandMonitor.
+        """
+        def labels(method, route):
+            return f'method="{method}",route="{_escape(route)}"'
+
+        lines = ["# HELP http_requests_total Requests completed, by route and status.",
+                 "# TYPE http_requests_total counter"]
+        for (method, route, status), count in sorted(self._requests.items()):
+            lines.append(f'http_requests_total{{{labels(method, route)},status="{status}"}} {count}')
+
+        lines += ["# HELP http_request_duration_seconds Time to send the full response.",
+                  "# TYPE http_request_duration_seconds histogram"]
+        for (method, route), histogram in sorted(self._latency.items()):
+            lines += histogram.lines("http_request_duration_seconds", labels(method, route))
+
+        lines += ["# HELP http_response_size_bytes Response body size.",
+                  "# TYPE http_response_size_bytes histogram"]
+        for (method, route), histogram in sorted(self._sizes.items()):
+            lines += histogram.lines("http_response_size_bytes", labels(method, route))
+
+        lines += ["# HELP http_request_mongo_round_trips MongoDB commands issued per request.",
+                  "# TYPE http_request_mongo_round_trips histogram"]
+        for (method, route), histogram in sorted(self._round_trips.items()):
+            lines += histogram.lines("http_request_mongo_round_trips", labels(method, route))
+
+        lines += ["# HELP http_request_mongo_seconds Time spent in MongoDB commands per request.",
+                  "# TYPE http_request_mongo_seconds histogram"]
+        for (method, route), histogram in sorted(self._mongo_time.items()):
+            lines += histogram.lines("http_request_mongo_seconds", labels(method, route))
+
+        lines += ["# HELP http_requests_in_flight Requests currently being handled.",
+                  "# TYPE http_requests_in_flight gauge"]
+        for (method, route), count in sorted(self.in_flight().items()):
+            lines.append(f'http_requests_in_flight{{{labels(method, route)}}} {count}')
+
+        if mongo_commands is not None:
+            lines += ["# HELP mongodb_commands_total MongoDB commands completed, by command name.",
+                      "# TYPE mongodb_commands_total counter"]
+            for command, (count, _) in sorted(mongo_commands.items()):
+                lines.append(f'mongodb_commands_total{{command="{_escape(command)}"}} {count}')
+            lines += ["# HELP mongodb_command_seconds_total Time spent in MongoDB commands, by command name.",
+                      "# TYPE mongodb_command_seconds_total counter"]
+            for command, (_, seconds) in sorted(mongo_commands.items()):
+                lines.append(f'mongodb_command_seconds_total{{command="{_escape(command)}"}} {seconds}')
+
+        for name, value in (gauges or {}).items():
+            lines += [f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware feeding a RequestMetrics; websockets pass through.
+    Each request gets its own CommandStats for CommandMonitor to count into,
+    and with `debug_headers` the totals are returned as X-Mongo-Round-Trips
+    and X-Mongo-Time-Ms.
+    """
+
+    def __init__(self, app, metrics: RequestMetrics, debug_headers: bool = False):
+        self.app = app
+        self.metrics = metrics
+        self.debug_headers = debug_headers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        key = self.metrics.start(scope)
+        status = 500
+        size = 0
+        mongo = CommandStats()
+        token = current_stats.set(mongo)
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.debug_headers:
+                    # The handler has finished by the time headers go out
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (ROUND_TRIPS_HEADER.lower().encode(), str(mongo.commands).encode()),
+                        (DURATION_HEADER.lower().encode(), f"{mongo.duration_micros / 1000:.2f}".encode()),
+                    ]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_stats.reset(token)
+            self.metrics.finish(key, scope, status, size, time.perf_counter() - start, mongo)
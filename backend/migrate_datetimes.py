@@ -0,0 +1,128 @@
+"""
+Rewrite ISO-string timestamps as native BSON dates.
+
+    python migrate_datetimes.py [--batch-size 500] [--pause 0.1] [--reset] [collection ...]
+
+Walks each collection in _id order, one batch at a time, and records a
+checkpoint in the `migrations` collection after every batch, so an
+interrupted run picks up where it stopped. --pause sleeps between batches
+to keep the load on the primary low. Safe to run while the app is serving:
+each update is guarded on the old string value, and new writes already
+store dates.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+# Timestamp fields per collection
+DATETIME_FIELDS = {
+    "users": ["created_at", "last_active"],
+    "swipes": ["created_at"],
+    "matches": ["created_at"],
+    "messages": ["created_at"],
+    "notifications": ["created_at"],
+    "decks": ["refilled_at"],
+}
+
+
+def parse_timestamp(value: str):
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+async def migrate_collection(db, name: str, batch_size: int = 500, pause: float = 0.1) -> dict:
+    fields = DATETIME_FIELDS[name]
+    checkpoint_id = f"datetimes.{name}"
+    state = await db.migrations.find_one({"_id": checkpoint_id}) or {}
+    if state.get('done'):
+        return state
+
+    last_id = state.get('last_id')
+    while True:
+        query = {"_id": {"$gt": last_id}} if last_id is not None else {}
+        docs = await db[name].find(query, {field: 1 for field in fields}).sort("_id", 1).to_list(batch_size)
+        if not docs:
+            break
+
+        operations = []
+        unparsed = 0
+        for doc in docs:
+            guard = {"_id": doc['_id']}
+            update = {}
+            for field in fields:
+                value = doc.get(field)
+                if not isinstance(value, str):
+                    continue
+                parsed = parse_timestamp(value)
+                if parsed is None:
+                    unparsed += 1
+                    continue
+                guard[field] = value
+                update[field] = parsed
+            if update:
+                operations.append(UpdateOne(guard, {"$set": update}))
+        if operations:
+            await db[name].bulk_write(operations, ordered=False)
+
+        last_id = docs[-1]['_id']
+        await db.migrations.update_one(
+            {"_id": checkpoint_id},
+            {
+                "$set": {"last_id": last_id, "updated_at": datetime.now(timezone.utc)},
+                "$inc": {"scanned": len(docs), "converted": len(operations), "unparsed": unparsed}
+            },
+            upsert=True
+        )
+        if pause:
+            await asyncio.sleep(pause)
+
+    await db.migrations.update_one(
+        {"_id": checkpoint_id},
+        {"$set": {"done": True, "updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+    return await db.migrations.find_one({"_id": checkpoint_id})
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("collections", nargs="*", help=f"any of {', '.join(DATETIME_FIELDS)} (default: all)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.1, help="seconds to sleep between batches")
+    parser.add_argument("--reset", action="store_true", help="discard checkpoints and start over")
+    args = parser.parse_args()
+    unknown = set(args.collections) - set(DATETIME_FIELDS)
+    if unknown:
+        parser.error(f"unknown collections: {', '.join(sorted(unknown))}")
+
+    ROOT_DIR = Path(__file__).parent
+    load_dotenv(ROOT_DIR / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ['DB_NAME']]
+    try:
+        for name in args.collections or DATETIME_FIELDS:
+            if args.reset:
+                await db.migrations.delete_one({"_id": f"datetimes.{name}"})
+            state = await migrate_collection(db, name, args.batch_size, args.pause)
+            print(f"✅ {name}: {state.get('converted', 0)} of {state.get('scanned', 0)} documents converted")
+            if state.get('unparsed'):
+                print(f"⚠️  {name}: {state['unparsed']} values are not ISO timestamps and were left as is")
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
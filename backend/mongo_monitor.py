@@ -0,0 +1,88 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from pymongo import monitoring
+
+# Response header carrying the number of MongoDB commands a request issued
+ROUND_TRIPS_HEADER = "X-Mongo-Round-Trips"
+DURATION_HEADER = "X-Mongo-Time-Ms"
+
+
+class CommandStats:
+    __slots__ = ("commands", "duration_micros")
+
+    def __init__(self):
+        self.commands = 0
+        self.duration_micros = 0
+
+
+# Stats for the request being handled. Motor runs driver calls on its
+# executor with a copy of the caller's context, so commands land on the
+# request that issued them; background tasks started outside a request
+# record nothing.
+current_stats: ContextVar = ContextVar("mongo_command_stats", default=None)
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """
+    pymongo command listener, registered on the client with
+    `event_listeners=[...]`. Counts every command (find, getMore, insert,
+    aggregate, ...) and its duration against the current request, and keeps
+    process-wide totals per command name for /metrics.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals = {}
+
+    def _record(self, event):
+        stats = current_stats.get()
+        if stats is not None:
+            stats.commands += 1
+            stats.duration_micros += event.duration_micros
+        with self._lock:
+            count, micros = self._totals.get(event.command_name, (0, 0))
+            self._totals[event.command_name] = (count + 1, micros + event.duration_micros)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        self._record(event)
+
+    def totals(self) -> dict:
+        """Command name -> (count, total seconds)."""
+        with self._lock:
+            return {name: (count, micros / 1e6) for name, (count, micros) in self._totals.items()}
+
+
+@contextmanager
+def track_commands():
+    """Count the commands issued inside the block, e.g. in scripts or benchmarks."""
+    stats = CommandStats()
+    token = current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_stats.reset(token)
+
+
+def round_trips(response) -> int:
+    """Commands a request issued, from the debug header (MONGO_DEBUG_HEADERS=true)."""
+    value = response.headers.get(ROUND_TRIPS_HEADER)
+    if value is None:
+        raise AssertionError(f"Response has no {ROUND_TRIPS_HEADER} header; set MONGO_DEBUG_HEADERS=true")
+    return int(value)
+
+
+def assert_max_round_trips(response, limit: int):
+    count = round_trips(response)
+    if count > limit:
+        request = response.request
+        raise AssertionError(
+            f"{request.method} {request.url.path} made {count} MongoDB round trips, expected at most {limit}"
+        )
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from collections import deque
+
+from pymongo.errors import BulkWriteError
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationOutbox:
+    """
+    Takes notification writes off the request path. Handlers enqueue fully
+    built notification documents; a background task writes them with
+    insert_many once `batch_size` are waiting or `flush_interval` seconds have
+    passed. Messages may reference the acting user as `{name}`; names for a
+    whole batch are resolved at write time, from `profiles` (a ProfileCache)
+    when given, otherwise with one $in query.
+
+    Failed batches are retried up to `max_attempts` times, and stop() drains
+    whatever is still queued. `after_write`, if given, is awaited with the
+    documents of each batch once they are stored.
+    """
+
+    def __init__(self, db, batch_size: int = 100, flush_interval: float = 0.5, max_attempts: int = 3,
+                 after_write=None, profiles=None):
+        self.db = db
+        self.profiles = profiles
+        self.after_write = after_write
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self._queue = deque()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = None
+        self.enqueued = 0
+        self.written = 0
+        self.retried = 0
+        self.dropped = 0
+
+    @property
+    def depth(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, doc: dict, actor_id: str = None):
+        self._queue.append((doc, actor_id, 0))
+        self.enqueued += 1
+        if len(self._queue) >= self.batch_size:
+            self._wakeup.set()
+
+    async def _resolve_names(self, batch) -> dict:
+        actor_ids = list({actor_id for _, actor_id, _ in batch if actor_id})
+        if not actor_ids:
+            return {}
+        if self.profiles is not None:
+            cards = await self.profiles.get_cards(actor_ids)
+            return {user_id: c.get('name', "") for user_id, c in cards.items()}
+        users = await self.db.users.find(
+            {"id": {"$in": actor_ids}},
+            {"_id": 0, "id": 1, "name": 1}
+        ).to_list(None)
+        return {u['id']: u.get('name', "") for u in users}
+
+    async def flush(self) -> int:
+        """Write one batch. Returns the number of notifications written."""
+        batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+        if not batch:
+            return 0
+        try:
+            names = await self._resolve_names(batch)
+            docs = []
+            for doc, actor_id, _ in batch:
+                if actor_id:
+                    doc = {**doc, "message": doc['message'].format(name=names.get(actor_id, ""))}
+                docs.append(doc)
+            await self.db.notifications.insert_many(docs, ordered=False)
+        except asyncio.CancelledError:
+            # Not a failed attempt; leave the batch for whoever drains next
+            self._queue.extendleft(reversed(batch))
+            raise
+        except BulkWriteError as e:
+            # Duplicate ids were written by an earlier attempt; retry the rest
+            failed = {
+                error['index'] for error in e.details.get('writeErrors', [])
+                if error.get('code') != 11000
+            }
+            self._requeue([item for i, item in enumerate(batch) if i in failed])
+            docs = [doc for i, doc in enumerate(docs) if i not in failed]
+            await self._after_write(docs)
+            self.written += len(docs)
+            return len(docs)
+        except Exception:
+            logger.exception("Notification batch of %d failed", len(batch))
+            self._requeue(batch)
+            return 0
+        await self._after_write(docs)
+        self.written += len(docs)
+        return len(docs)
+
+    async def _after_write(self, docs):
+        if self.after_write is None or not docs:
+            return
+        try:
+            await self.after_write(docs)
+        except Exception:
+            logger.exception("after_write hook failed for %d notifications", len(docs))
+
+    def _requeue(self, batch):
+        # Back at the front so ordering is preserved across retries
+        for doc, actor_id, attempts in reversed(batch):
+            if attempts + 1 < self.max_attempts:
+                self._queue.appendleft((doc, actor_id, attempts + 1))
+                self.retried += 1
+            else:
+                self.dropped += 1
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._queue:
+                if not await self.flush():
+                    break
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # Let the loop finish the batch it is writing rather than cancel it
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        for _ in range(self.max_attempts):
+            while self._queue:
+                if not await self.flush():
+                    break
+            if not self._queue:
+                break
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "retried": self.retried,
+            "dropped": self.dropped
+        }
@@ -0,0 +1,54 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+
+
+# Opaque keyset cursors: the sort key values of the last item on a page,
+# serialized as url-safe base64 so clients treat them as tokens. Datetimes
+# are tagged so they decode back to datetimes and compare as BSON dates.
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if set(value) != {"$date"} or not isinstance(value["$date"], str):
+            raise ValueError("unknown cursor value")
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("wrong cursor size")
+        return [_decode_value(v) for v in values]
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_before(value, item_id, field: str = "created_at") -> dict:
+    """Filter for items strictly older than (value, id) in a descending scan on `field`."""
+    return {"$or": [
+        {field: {"$lt": value}},
+        {field: value, "id": {"$lt": item_id}}
+    ]}
+
+
+def keyset_after(value, item_id, field: str = "created_at") -> dict:
+    """Filter for items strictly newer than (value, id) in an ascending scan on `field`."""
+    return {"$or": [
+        {field: {"$gt": value}},
+        {field: value, "id": {"$gt": item_id}}
+    ]}
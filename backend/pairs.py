@@ -0,0 +1,169 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
+
+# One document per pair of users, keyed by the sorted id pair:
+#   {key: "<low>|<high>", users: [low, high], liked_low, liked_high, match_id|null}
+# A like sets its side's flag and, in the same atomic pipeline update, claims
+# a match id if both sides now like each other and none is set yet. Exactly
+# one request can win that claim, so simultaneous likes always produce one
+# match and repeated likes never produce another.
+
+
+def pair_key(user_id: str, other_id: str) -> str:
+    low, high = sorted((user_id, other_id))
+    return f"{low}|{high}"
+
+
+def _like_pipeline(user_id: str, other_id: str, match_id: str) -> list:
+    low, high = sorted((user_id, other_id))
+    side = "liked_low" if user_id == low else "liked_high"
+    return [
+        {"$set": {"key": f"{low}|{high}", "users": [low, high], side: True}},
+        {"$set": {"match_id": {"$ifNull": [
+            "$match_id",
+            {"$cond": [{"$and": ["$liked_low", "$liked_high"]}, match_id, None]}
+        ]}}}
+    ]
+
+
+async def record_like(db, user_id: str, other_id: str):
+    """
+    Record a like in one round trip. Returns (match_id, created): match_id is
+    set when the pair is matched, created is True only for the request that
+    made the match.
+    """
+    proposed = str(uuid.uuid4())
+    pair = await db.pairs.find_one_and_update(
+        {"key": pair_key(user_id, other_id)},
+        _like_pipeline(user_id, other_id, proposed),
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+        projection={"_id": 0, "match_id": 1}
+    )
+    match_id = pair.get('match_id')
+    return match_id, match_id == proposed
+
+
+async def record_likes(db, user_id: str, other_ids: list) -> dict:
+    """Batch form of record_like: one bulk_write plus one read for all pairs."""
+    proposed = {other_id: str(uuid.uuid4()) for other_id in dict.fromkeys(other_ids)}
+    if not proposed:
+        return {}
+    await db.pairs.bulk_write([
+        UpdateOne(
+            {"key": pair_key(user_id, other_id)},
+            _like_pipeline(user_id, other_id, match_id),
+            upsert=True
+        )
+        for other_id, match_id in proposed.items()
+    ], ordered=False)
+    keys = {pair_key(user_id, other_id): other_id for other_id in proposed}
+    pairs = await db.pairs.find(
+        {"key": {"$in": list(keys)}},
+        {"_id": 0, "key": 1, "match_id": 1}
+    ).to_list(None)
+    result = {}
+    for pair in pairs:
+        other_id = keys[pair['key']]
+        match_id = pair.get('match_id')
+        result[other_id] = (match_id, match_id is not None and match_id == proposed[other_id])
+    return result
+
+
+async def backfill_pairs(db, batch_size: int = 1000) -> int:
+    """Build pair documents from existing like swipes and matches."""
+    operations = []
+    likes = 0
+    async for swipe in db.swipes.find({"action": "like"}, {"_id": 0, "from_user_id": 1, "to_user_id": 1}):
+        low, high = sorted((swipe['from_user_id'], swipe['to_user_id']))
+        side = "liked_low" if swipe['from_user_id'] == low else "liked_high"
+        operations.append(UpdateOne(
+            {"key": f"{low}|{high}"},
+            {"$set": {side: True}, "$setOnInsert": {"users": [low, high]}},
+            upsert=True
+        ))
+        if len(operations) >= batch_size:
+            await db.pairs.bulk_write(operations, ordered=False)
+            likes += len(operations)
+            operations = []
+    if operations:
+        await db.pairs.bulk_write(operations, ordered=False)
+        likes += len(operations)
+
+    # Point each pair at its oldest match. Later duplicate matches keep no
+    # pair_key so they stay outside the unique index.
+    pair_ops, match_ops = [], []
+    keyed = set()
+    async for match in db.matches.find({}, {"_id": 0, "id": 1, "user1_id": 1, "user2_id": 1}).sort("created_at", 1):
+        key = pair_key(match['user1_id'], match['user2_id'])
+        if key in keyed:
+            continue
+        keyed.add(key)
+        pair_ops.append(UpdateOne({"key": key}, {"$set": {"match_id": match['id']}}, upsert=True))
+        match_ops.append(UpdateOne({"id": match['id']}, {"$set": {"pair_key": key}}))
+    for i in range(0, len(pair_ops), batch_size):
+        await db.pairs.bulk_write(pair_ops[i:i + batch_size], ordered=False)
+        await db.matches.bulk_write(match_ops[i:i + batch_size], ordered=False)
+    return likes
+
+
+async def repair_matches(db, batch_size: int = 1000) -> int:
+    """Write the match document for matched pairs that have none."""
+    repaired = 0
+    batch = []
+
+    async def flush():
+        nonlocal repaired
+        existing = await db.matches.find(
+            {"pair_key": {"$in": [pair['key'] for pair in batch]}}, {"_id": 0, "pair_key": 1}
+        ).to_list(None)
+        have = {match['pair_key'] for match in existing}
+        now = datetime.now(timezone.utc)
+        operations = [
+            UpdateOne({"pair_key": pair['key']}, {"$setOnInsert": {
+                "id": pair['match_id'],
+                "user1_id": pair['key'].split("|")[0],
+                "user2_id": pair['key'].split("|")[1],
+                "created_at": now,
+                "pair_key": pair['key'],
+                "last_activity_at": now,
+            }}, upsert=True)
+            for pair in batch if pair['key'] not in have
+        ]
+        if operations:
+            await db.matches.bulk_write(operations, ordered=False)
+            repaired += len(operations)
+
+    async for pair in db.pairs.find({"match_id": {"$ne": None}}, {"_id": 0, "key": 1, "match_id": 1}):
+        batch.append(pair)
+        if len(batch) >= batch_size:
+            await flush()
+            batch = []
+    if batch:
+        await flush()
+    return repaired
+
+
+async def main():
+    ROOT_DIR = Path(__file__).parent
+    load_dotenv(ROOT_DIR / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        written = await backfill_pairs(db)
+        print(f"✅ Backfilled {written} pair likes")
+        repaired = await repair_matches(db)
+        print(f"✅ Repaired {repaired} matches missing their document")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
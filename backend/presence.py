@@ -0,0 +1,109 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from pymongo import UpdateOne
+
+logger = logging.getLogger(__name__)
+
+
+class PresenceTracker:
+    """
+    Records user activity in memory and writes it to `users` in one
+    bulk_write every `flush_interval` seconds, so authenticated reads don't
+    each become a write. Stored presence lags by at most `flush_interval`;
+    apply() overlays pending activity so API responses never do.
+
+    Flushed activity is kept for `retain` seconds more and overlaid too, so
+    profiles cached from before the flush (for up to the profile cache TTL)
+    still show it.
+    """
+
+    def __init__(self, db, flush_interval: float = 5.0, retain: float = 0.0):
+        self.db = db
+        self.flush_interval = flush_interval
+        self.retain = retain
+        self._pending = {}
+        self._recent = {}
+        self._flushing = {}
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task = None
+
+    def touch(self, user_id: str):
+        self._pending[user_id] = datetime.now(timezone.utc)
+
+    def forget(self, user_id: str):
+        self._pending.pop(user_id, None)
+        self._recent.pop(user_id, None)
+        self._flushing.pop(user_id, None)
+
+    def apply(self, user: dict) -> dict:
+        user_id = user.get('id')
+        last_active = self._pending.get(user_id) or self._flushing.get(user_id) or self._recent.get(user_id)
+        stored = user.get('last_active')
+        if last_active is not None and (not isinstance(stored, datetime) or stored < last_active):
+            user['online'] = True
+            user['last_active'] = last_active
+        return user
+
+    async def flush(self):
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, {}
+        self._flushing = pending
+        operations = [
+            UpdateOne(
+                {"id": user_id},
+                {"$set": {"online": True, "last_active": last_active}}
+            )
+            for user_id, last_active in pending.items()
+        ]
+        try:
+            await self.db.users.bulk_write(operations, ordered=False)
+        except (Exception, asyncio.CancelledError):
+            self._flushing = {}
+            # Put the batch back unless newer activity arrived meanwhile
+            for user_id, last_active in pending.items():
+                self._pending.setdefault(user_id, last_active)
+            raise
+        self._flushing = {}
+        self._remember(pending)
+        return len(operations)
+
+    def _remember(self, flushed: dict):
+        if self.retain <= 0:
+            return
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.retain)
+        self._recent = {
+            user_id: last_active for user_id, last_active in self._recent.items() if last_active > cutoff
+        }
+        for user_id, last_active in flushed.items():
+            if last_active > cutoff:
+                self._recent[user_id] = last_active
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Presence flush failed")
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._wakeup.clear()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # Let the loop finish the flush it is in rather than cancel it
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
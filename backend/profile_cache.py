@@ -0,0 +1,114 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+# Everything a profile read may return; the password hash and the ranking
+# vector never enter the cache
+PROFILE_PROJECTION = {"_id": 0, "password": 0, "interest_bits": 0}
+
+# Fields shown wherever another user is referenced (notifications, pushes)
+CARD_FIELDS = ("id", "name", "age", "gender", "location", "photos", "verified")
+
+
+def card(profile: dict) -> dict:
+    return {field: profile[field] for field in CARD_FIELDS if field in profile}
+
+
+class ProfileCache:
+    """
+    Read-through LRU of user profiles keyed by id. Entries expire after `ttl`
+    seconds so changes made outside update_profile (presence flushes, scripts)
+    show up eventually; update_profile calls invalidate() so the owner sees
+    their edits immediately. Concurrent misses for the same id share a single
+    find_one. Callers get a copy and may modify it.
+    """
+
+    def __init__(self, db, maxsize: int = 10000, ttl: float = 60.0):
+        self.db = db
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._invalidations = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, user_id: str):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        profile, expires_at = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return profile
+
+    def _store(self, user_id: str, profile: dict):
+        self._entries[user_id] = (profile, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def _fetch(self, user_id: str):
+        task = asyncio.current_task()
+        try:
+            profile = await self.db.users.find_one({"id": user_id}, PROFILE_PROJECTION)
+            # Skip the store if the profile was invalidated while we waited
+            if profile is not None and self._inflight.get(user_id) is task:
+                self._store(user_id, profile)
+            return profile
+        finally:
+            if self._inflight.get(user_id) is task:
+                del self._inflight[user_id]
+
+    async def get(self, user_id: str):
+        """The user's profile without the password hash, or None."""
+        profile = self._lookup(user_id)
+        if profile is not None:
+            self.hits += 1
+            return dict(profile)
+        self.misses += 1
+        task = self._inflight.get(user_id)
+        if task is None:
+            task = asyncio.create_task(self._fetch(user_id))
+            self._inflight[user_id] = task
+        # Shielded so one cancelled caller doesn't fail everyone waiting on the read
+        profile = await asyncio.shield(task)
+        return dict(profile) if profile is not None else None
+
+    async def get_cards(self, user_ids) -> dict:
+        """Cards for every known id, reading all misses with one $in query."""
+        cards = {}
+        missing = []
+        for user_id in dict.fromkeys(user_ids):
+            profile = self._lookup(user_id)
+            if profile is None:
+                missing.append(user_id)
+            else:
+                cards[user_id] = card(profile)
+        self.hits += len(cards)
+        self.misses += len(missing)
+        if missing:
+            invalidations = self._invalidations
+            profiles = await self.db.users.find({"id": {"$in": missing}}, PROFILE_PROJECTION).to_list(None)
+            for profile in profiles:
+                if self._invalidations == invalidations:
+                    self._store(profile['id'], profile)
+                cards[profile['id']] = card(profile)
+        return cards
+
+    def invalidate(self, user_id: str):
+        self._entries.pop(user_id, None)
+        self._inflight.pop(user_id, None)
+        self._invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import os
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+# Interests are hashed into a fixed-width bit vector so overlap between one
+# user and a whole batch of candidates is a single AND + popcount over an
+# (n, INTEREST_WORDS) uint64 matrix. The vector is stored on each user as
+# `interest_bits` when interests are written, so building a batch only joins
+# bytes; changing the width or the hash means re-running `python ranking.py`.
+INTEREST_WORDS = 4
+INTEREST_BITS = INTEREST_WORDS * 64
+INTEREST_BYTES = INTEREST_WORDS * 8
+
+INTEREST_WEIGHT = 0.5
+AGE_WEIGHT = 0.3
+RECENCY_WEIGHT = 0.2
+AGE_SCALE_YEARS = 5.0
+RECENCY_SCALE_HOURS = 72.0
+
+
+@lru_cache(maxsize=65536)
+def _interest_bit(interest: str) -> int:
+    digest = hashlib.blake2b(interest.strip().casefold().encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') % INTEREST_BITS
+
+
+def interest_bits(interests) -> bytes:
+    """The `interest_bits` value stored on a user document."""
+    mask = 0
+    for interest in interests or ():
+        mask |= 1 << _interest_bit(interest)
+    return mask.to_bytes(INTEREST_BYTES, 'little')
+
+
+def _stored_bits(user: dict) -> bytes:
+    # Documents written before interest_bits existed are encoded on the fly
+    bits = user.get('interest_bits')
+    if bits is not None and len(bits) == INTEREST_BYTES:
+        return bits
+    return interest_bits(user.get('interests'))
+
+
+def encode_interests(interests) -> np.ndarray:
+    return np.frombuffer(interest_bits(interests), dtype='<u8').astype(np.uint64)
+
+
+def _timestamp(value) -> float:
+    if isinstance(value, (int, float)):
+        return value / 1000.0
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return 0.0
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return 0.0
+
+
+def _interest_matrix(users: list) -> bytes:
+    try:
+        joined = b''.join([user.get('interest_bits') for user in users])
+        if len(joined) == len(users) * INTEREST_BYTES:
+            return joined
+    except TypeError:
+        pass
+    # Some documents lack interest_bits (or have the wrong width)
+    return b''.join([_stored_bits(user) for user in users])
+
+
+def _timestamps(values: list) -> np.ndarray:
+    # Decks project last_active as epoch milliseconds, so the common case is
+    # one vectorized conversion; nulls and datetimes take the slow path
+    try:
+        return np.array(values, dtype=np.int64) / 1000.0
+    except (TypeError, ValueError):
+        return np.array([_timestamp(value) for value in values], dtype=np.float64)
+
+
+if hasattr(np, 'bitwise_count'):
+    def _popcount_rows(words: np.ndarray) -> np.ndarray:
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int32)
+else:
+    def _popcount_rows(words: np.ndarray) -> np.ndarray:
+        bits = np.unpackbits(words.view(np.uint8).reshape(*words.shape[:-1], -1), axis=-1)
+        return bits.sum(axis=-1, dtype=np.int32)
+
+
+class CandidateBatch:
+    """Column-oriented features for a batch of candidate users."""
+
+    def __init__(self, users: list):
+        self.users = users
+        count = len(users)
+        self.interests = np.frombuffer(_interest_matrix(users), dtype='<u8').astype(np.uint64).reshape(
+            count, INTEREST_WORDS
+        )
+        self.ages = np.array([user.get('age') or 0 for user in users], dtype=np.float32)
+        self.last_active = _timestamps([user.get('last_active') for user in users])
+
+    def __len__(self):
+        return len(self.users)
+
+
+def score_batch(user: dict, batch: CandidateBatch, now: float = None) -> np.ndarray:
+    """
+    Compatibility of `user` with every candidate in `batch`, in [0, 1]:
+    share of the user's interests the candidate shares, closeness in age,
+    and how recently the candidate was active.
+    """
+    now = datetime.now(timezone.utc).timestamp() if now is None else now
+    mine = np.frombuffer(_stored_bits(user), dtype='<u8').astype(np.uint64)
+    my_count = max(int(_popcount_rows(mine)), 1)
+
+    interest_score = _popcount_rows(batch.interests & mine) / my_count
+    age_gap = np.abs(batch.ages - float(user.get('age') or 0))
+    age_score = np.exp(-age_gap / AGE_SCALE_YEARS)
+    idle_hours = np.maximum(now - batch.last_active, 0.0) / 3600.0
+    recency_score = np.exp(-idle_hours / RECENCY_SCALE_HOURS)
+
+    return INTEREST_WEIGHT * interest_score + AGE_WEIGHT * age_score + RECENCY_WEIGHT * recency_score
+
+
+def rank_candidates(user: dict, candidates: list, limit: int) -> list:
+    """Return the `limit` best-scoring candidates, best first."""
+    if not candidates:
+        return []
+    batch = CandidateBatch(candidates)
+    scores = score_batch(user, batch)
+    if len(candidates) > limit:
+        top = np.argpartition(-scores, limit - 1)[:limit]
+    else:
+        top = np.arange(len(candidates))
+    order = top[np.argsort(-scores[top], kind='stable')]
+    return [candidates[i] for i in order]
+
+
+async def backfill_interest_bits(db, batch_size: int = 1000) -> int:
+    """Store interest_bits on every user from their interests."""
+    written = 0
+    operations = []
+    async for user in db.users.find({}, {"_id": 0, "id": 1, "interests": 1}):
+        operations.append(UpdateOne({"id": user['id']}, {"$set": {"interest_bits": interest_bits(user.get('interests'))}}))
+        if len(operations) >= batch_size:
+            await db.users.bulk_write(operations, ordered=False)
+            written += len(operations)
+            operations = []
+    if operations:
+        await db.users.bulk_write(operations, ordered=False)
+        written += len(operations)
+    return written
+
+
+async def main():
+    ROOT_DIR = Path(__file__).parent
+    load_dotenv(ROOT_DIR / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        written = await backfill_interest_bits(db)
+        print(f"✅ Stored interest bits for {written} users")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,159 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+logger = logging.getLogger(__name__)
+
+
+class Broker(ABC):
+    """
+    Carries events between workers. publish() sends an event addressed to a
+    user to every worker; each worker hands it to the callback passed to
+    start(), which delivers it to that worker's local connections.
+    Implementations backed by Redis pub/sub, NATS or a MongoDB change stream
+    plug in here.
+    """
+
+    @abstractmethod
+    async def start(self, deliver):
+        ...
+
+    @abstractmethod
+    async def publish(self, user_id: str, event: dict):
+        ...
+
+    @abstractmethod
+    async def stop(self):
+        ...
+
+
+class InMemoryBroker(Broker):
+    """Single-process broker, for one worker and for tests."""
+
+    def __init__(self):
+        self._deliver = None
+
+    async def start(self, deliver):
+        self._deliver = deliver
+
+    async def publish(self, user_id: str, event: dict):
+        if self._deliver is not None:
+            await self._deliver(user_id, event)
+
+    async def stop(self):
+        self._deliver = None
+
+
+class Connection:
+    def __init__(self, websocket: WebSocket, user_id: str, queue_size: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.last_seen = time.monotonic()
+        self.close_code = 1000
+        self.dropped = asyncio.Event()
+
+    async def send_loop(self):
+        while True:
+            await self.websocket.send_json(await self.queue.get())
+
+
+class ConnectionHub:
+    """
+    In-process registry of open sockets with per-user fan-out. Each socket has
+    a bounded outbound queue; a client that can't keep up is disconnected
+    rather than letting its backlog grow. Idle sockets are pinged every
+    `heartbeat_interval` seconds and dropped after two silent intervals.
+    """
+
+    def __init__(self, broker: Broker, queue_size: int = 100, heartbeat_interval: float = 25.0):
+        self.broker = broker
+        self.queue_size = queue_size
+        self.heartbeat_interval = heartbeat_interval
+        self._connections = {}
+
+    async def start(self):
+        await self.broker.start(self.deliver)
+
+    async def stop(self):
+        await self.broker.stop()
+        for connections in list(self._connections.values()):
+            for connection in list(connections):
+                await connection.websocket.close(code=1001)
+
+    def connection_count(self) -> int:
+        return sum(len(connections) for connections in self._connections.values())
+
+    async def publish(self, user_id: str, event_type: str, data: dict):
+        try:
+            await self.broker.publish(user_id, {"type": event_type, "data": data})
+        except Exception:
+            # Real-time delivery is best effort; clients resync over REST
+            logger.exception("Failed to publish %s event", event_type)
+
+    async def deliver(self, user_id: str, event: dict):
+        for connection in list(self._connections.get(user_id, ())):
+            self._enqueue(connection, event)
+
+    def _enqueue(self, connection: Connection, event: dict):
+        try:
+            connection.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            logger.warning("Dropping slow websocket client for user %s", connection.user_id)
+            self._remove(connection)
+            connection.close_code = 1013
+            # Ends serve() even while send_json is stuck on the slow client
+            connection.dropped.set()
+
+    def _add(self, connection: Connection):
+        self._connections.setdefault(connection.user_id, set()).add(connection)
+
+    def _remove(self, connection: Connection):
+        connections = self._connections.get(connection.user_id)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self._connections[connection.user_id]
+
+    async def _receive_loop(self, connection: Connection):
+        while True:
+            message = await connection.websocket.receive_json()
+            connection.last_seen = time.monotonic()
+            if isinstance(message, dict) and message.get("type") == "ping":
+                self._enqueue(connection, {"type": "pong"})
+
+    async def _heartbeat_loop(self, connection: Connection):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            if time.monotonic() - connection.last_seen > 2 * self.heartbeat_interval:
+                connection.close_code = 1001
+                return
+            self._enqueue(connection, {"type": "ping"})
+
+    async def serve(self, websocket: WebSocket, user_id: str):
+        """Run an accepted socket until the client disconnects."""
+        connection = Connection(websocket, user_id, self.queue_size)
+        self._add(connection)
+        tasks = [
+            asyncio.create_task(connection.send_loop()),
+            asyncio.create_task(self._receive_loop(connection)),
+            asyncio.create_task(self._heartbeat_loop(connection)),
+            asyncio.create_task(connection.dropped.wait()),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if error is not None and not isinstance(error, WebSocketDisconnect):
+                    logger.warning("Websocket for user %s closed: %r", user_id, error)
+        finally:
+            self._remove(connection)
+            for task in tasks:
+                task.cancel()
+            try:
+                await websocket.close(code=connection.close_code)
+            except Exception:
+                pass
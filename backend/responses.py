@@ -0,0 +1,32 @@
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+# The Motor client is tz_aware, so stored dates come back as aware UTC
+# datetimes and serialize with their +00:00 offset. Naive values would only
+# come from code building datetimes without a zone; treat those as UTC too
+# rather than emitting a timestamp without an offset.
+ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC
+
+
+def _default(value):
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(Response):
+    """
+    JSON response rendered by orjson straight from raw documents and models.
+    Returning one from a route bypasses FastAPI's jsonable_encoder walk, and
+    every datetime is turned into an ISO 8601 string here and nowhere else.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(content)
@@ -6,6 +6,8 @@ from datetime import datetime, timezone
 from dotenv import load_dotenv
 from pathlib import Path
 
+from ranking import interest_bits
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
@@ -31,7 +33,7 @@ DEMO_USERS = [
             "https://images.pexels.com/photos/3419650/pexels-photo-3419650.jpeg"
         ],
         "interests": ["السفر", "التصوير", "القراءة"],
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": "demo-user-2",
@@ -47,7 +49,7 @@ DEMO_USERS = [
             "https://images.unsplash.com/photo-1653129305118-3c5b26df576c?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2NjZ8MHwxfHNlYXJjaHwzfHxwb3J0cmFpdCUyMGhlYWRzaG90fGVufDB8fHx8MTc2MDg2MDYyMXww&ixlib=rb-4.1.0&q=85"
         ],
         "interests": ["البرمجة", "الرياضة", "الموسيقى"],
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": "demo-user-3",
@@ -63,7 +65,7 @@ DEMO_USERS = [
             "https://images.unsplash.com/photo-1721411395539-152e35906fc6?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NTY2NjZ8MHwxfHNlYXJjaHwyfHxwb3J0cmFpdCUyMGhlYWRzaG90fGVufDB8fHx8MTc2MDg2MDYyMXww&ixlib=rb-4.1.0&q=85"
         ],
         "interests": ["الفن", "الكتابة", "السينما"],
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": "demo-user-4",
@@ -79,7 +81,7 @@ DEMO_USERS = [
             "https://images.unsplash.com/photo-1593944828451-643371360971?crop=entropy&cs=srgb&fm=jpg&ixid=M3w3NDk1Nzl8MHwxfHNlYXJjaHw0fHxkYXRpbmclMjBwcm9maWxlJTIwcGhvdG9zfGVufDB8fHx8MTc2MDg2MDYxNXww&ixlib=rb-4.1.0&q=85"
         ],
         "interests": ["الطب", "القراءة", "السباحة"],
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     },
     {
         "id": "demo-user-5",
@@ -95,7 +97,7 @@ DEMO_USERS = [
             "https://images.pexels.com/photos/3419650/pexels-photo-3419650.jpeg"
         ],
         "interests": ["التصميم", "الفن", "الموضة"],
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "created_at": datetime.now(timezone.utc)
     }
 ]
 
@@ -106,7 +108,9 @@ async def seed_users():
     await db.users.delete_many({"id": {"$regex": "^demo-user-"}})
     
     # Insert demo users
-    await db.users.insert_many(DEMO_USERS)
+    await db.users.insert_many([
+        {**user, "interest_bits": interest_bits(user['interests'])} for user in DEMO_USERS
+    ])
     
     print(f"✅ تم إضافة {len(DEMO_USERS)} مستخدمين تجريبيين بنجاح!")
     print("\n📝 يمكنك تسجيل الدخول باستخدام:")
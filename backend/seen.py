@@ -0,0 +1,133 @@
+import hashlib
+
+from bson import Int64
+
+# Per-user Bloom filter of swiped user ids, stored in the `seen` collection as
+# {user_id, words: {"<index>": <32-bit word>}, count, cursor, complete}.
+# Words are only materialised once a bit in them is set, so the document stays
+# small for light swipers and is capped at FILTER_BITS / 32 fields.
+FILTER_BITS = 1 << 19
+HASH_COUNT = 4
+WORD_BITS = 32
+
+# Discover scans users in id order starting from the stored cursor.
+SCAN_BATCH_SIZE = 200
+MAX_SCAN_BATCHES = 5
+
+
+def _bit_positions(target_id: str):
+    digest = hashlib.blake2b(target_id.encode('utf-8'), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], 'little')
+    h2 = int.from_bytes(digest[8:], 'little') | 1
+    return [(h1 + i * h2) % FILTER_BITS for i in range(HASH_COUNT)]
+
+
+def _bit_update(target_ids) -> dict:
+    words = {}
+    for target_id in target_ids:
+        for bit in _bit_positions(target_id):
+            key = f"words.{bit // WORD_BITS}"
+            words[key] = words.get(key, 0) | (1 << (bit % WORD_BITS))
+    return {key: {"or": Int64(mask)} for key, mask in words.items()}
+
+
+class SeenSet:
+    def __init__(self, doc: dict = None):
+        self.words = (doc or {}).get('words', {})
+        self.cursor = (doc or {}).get('cursor', "")
+
+    def might_contain(self, target_id: str) -> bool:
+        for bit in _bit_positions(target_id):
+            word = self.words.get(str(bit // WORD_BITS), 0)
+            if not word & (1 << (bit % WORD_BITS)):
+                return False
+        return True
+
+
+async def record_swipes(db, user_id: str, target_ids: list):
+    """Add swiped ids to the user's filter with a single atomic update."""
+    if not target_ids:
+        return
+    await db.seen.update_one(
+        {"user_id": user_id},
+        {"$bit": _bit_update(target_ids), "$inc": {"count": len(target_ids)}},
+        upsert=True
+    )
+
+
+async def rebuild_seen(db, user_id: str) -> SeenSet:
+    """Build the filter from the swipes collection for users that predate it."""
+    target_ids = []
+    async for swipe in db.swipes.find({"from_user_id": user_id}, {"_id": 0, "to_user_id": 1}):
+        target_ids.append(swipe['to_user_id'])
+    update = {"$set": {"complete": True, "count": len(target_ids)}}
+    if target_ids:
+        update["$bit"] = _bit_update(target_ids)
+    await db.seen.update_one({"user_id": user_id}, update, upsert=True)
+    return SeenSet(await db.seen.find_one({"user_id": user_id}, {"_id": 0}))
+
+
+async def load_seen(db, user_id: str) -> SeenSet:
+    doc = await db.seen.find_one({"user_id": user_id}, {"_id": 0})
+    # Documents upserted by record_swipes() alone miss swipes made before the
+    # filter existed; `complete` marks the ones built from the full history.
+    if doc is None or not doc.get('complete'):
+        return await rebuild_seen(db, user_id)
+    return SeenSet(doc)
+
+
+async def find_unseen_users(db, user_id: str, limit: int, projection: dict) -> list:
+    """
+    Return up to `limit` users this user has not swiped, scanning in id order
+    from the stored cursor and wrapping around once. Filter hits are verified
+    against `swipes` in one $in query per batch, so false positives never hide
+    a candidate. The cursor advances past the leading run of seen users so the
+    next call skips them without re-reading.
+    """
+    seen = await load_seen(db, user_id)
+    start = seen.cursor
+    position = start
+    wrapped = False
+    new_cursor = None
+    result = []
+
+    for _ in range(MAX_SCAN_BATCHES):
+        query = {"id": {"$gt": position, "$ne": user_id}}
+        if wrapped:
+            query["id"]["$lte"] = start
+        batch = await db.users.find(query, projection).sort("id", 1).to_list(SCAN_BATCH_SIZE)
+
+        maybe_seen = [u['id'] for u in batch if seen.might_contain(u['id'])]
+        swiped = set()
+        if maybe_seen:
+            swipes = await db.swipes.find(
+                {"from_user_id": user_id, "to_user_id": {"$in": maybe_seen}},
+                {"_id": 0, "to_user_id": 1}
+            ).to_list(None)
+            swiped = {s['to_user_id'] for s in swipes}
+
+        for user in batch:
+            if user['id'] in swiped:
+                if not result:
+                    new_cursor = user['id']
+                continue
+            result.append(user)
+            if len(result) >= limit:
+                break
+        if len(result) >= limit:
+            break
+
+        if len(batch) < SCAN_BATCH_SIZE:
+            if wrapped or not start:
+                break
+            wrapped = True
+            position = ""
+            if not result:
+                new_cursor = ""
+        else:
+            position = batch[-1]['id']
+
+    if new_cursor is not None and new_cursor != start:
+        await db.seen.update_one({"user_id": user_id}, {"$set": {"cursor": new_cursor}})
+
+    return result
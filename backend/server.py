@@ -1,24 +1,73 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Response, WebSocket
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import JSONResponse, PlainTextResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import InsertOne, UpdateOne
 import os
 import logging
+import math
+from contextlib import asynccontextmanager
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional
 import uuid
 from datetime import datetime, timezone, timedelta
-import bcrypt
 import jwt
 
+from indexes import ensure_indexes
+from pagination import encode_cursor, decode_cursor, keyset_after, keyset_before
+from seen import record_swipes
+from pairs import pair_key, record_like, record_likes
+from presence import PresenceTracker
+from passwords import PasswordHasher
+from token_cache import TokenCache
+from profile_cache import PROFILE_PROJECTION, ProfileCache
+from responses import FastJSONResponse
+from metrics import MetricsMiddleware, RequestMetrics
+from mongo_monitor import CommandMonitor
+from database import PoolMonitor, warm_up
+from realtime import ConnectionHub, InMemoryBroker
+from outbox import NotificationOutbox
+import counters
+from geo import geocode
+from decks import DeckManager
+from ranking import interest_bits
+
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+# Connections opened at startup and kept open while idle
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '10'))
+# /api/health/ready fails while more operations than this wait for a connection
+MONGO_READY_MAX_WAIT_QUEUE = int(os.environ.get('MONGO_READY_MAX_WAIT_QUEUE', '10'))
+mongo_options = {
+    "maxPoolSize": MONGO_MAX_POOL_SIZE,
+    "minPoolSize": MONGO_MIN_POOL_SIZE,
+    "maxConnecting": int(os.environ.get('MONGO_MAX_CONNECTING', '2')),
+    "waitQueueTimeoutMS": int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000')),
+    "connectTimeoutMS": int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+    "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+    "readPreference": os.environ.get('MONGO_READ_PREFERENCE', 'primary'),
+}
+if os.environ.get('MONGO_SOCKET_TIMEOUT_MS'):
+    mongo_options["socketTimeoutMS"] = int(os.environ['MONGO_SOCKET_TIMEOUT_MS'])
+# e.g. "zstd,snappy,zlib"; zstd and snappy need the zstandard / python-snappy packages
+if os.environ.get('MONGO_COMPRESSORS'):
+    mongo_options["compressors"] = os.environ['MONGO_COMPRESSORS']
+
+# Every command the driver sends is counted against the request that sent it
+command_monitor = CommandMonitor()
+pool_monitor = PoolMonitor(MONGO_MAX_POOL_SIZE)
+# Dates are stored as BSON dates and read back as aware UTC datetimes. The
+# client connects lazily; the lifespan below warms the pool up at startup.
+client = AsyncIOMotorClient(
+    mongo_url, tz_aware=True, event_listeners=[command_monitor, pool_monitor], **mongo_options
+)
 db = client[os.environ['DB_NAME']]
 
 # JWT Configuration
@@ -26,10 +75,95 @@ SECRET_KEY = os.environ.get('JWT_SECRET', 'pizoo-secret-key-change-in-production
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_HOURS = 24 * 7  # 7 days
 
+# Password hashing runs on a bounded worker pool, off the event loop
+password_hasher = PasswordHasher(
+    rounds=int(os.environ.get('BCRYPT_ROUNDS', '12')),
+    workers=int(os.environ.get('PASSWORD_WORKERS', '4')),
+    max_pending=int(os.environ.get('PASSWORD_QUEUE_LIMIT', '64'))
+)
+
+# Real-time events pushed over /api/ws
+hub = ConnectionHub(
+    InMemoryBroker(),
+    queue_size=int(os.environ.get('WS_QUEUE_SIZE', '100')),
+    heartbeat_interval=float(os.environ.get('WS_HEARTBEAT_SECONDS', '25'))
+)
+
+# Profiles by id, shared by profile reads and notification names
+PROFILE_CACHE_TTL_SECONDS = float(os.environ.get('PROFILE_CACHE_TTL_SECONDS', '60'))
+profile_cache = ProfileCache(
+    db,
+    maxsize=int(os.environ.get('PROFILE_CACHE_SIZE', '10000')),
+    ttl=PROFILE_CACHE_TTL_SECONDS
+)
+
+# Notifications are written in batches by a background task
+notification_outbox = NotificationOutbox(
+    db,
+    batch_size=int(os.environ.get('NOTIFICATION_BATCH_SIZE', '100')),
+    flush_interval=float(os.environ.get('NOTIFICATION_FLUSH_SECONDS', '0.5')),
+    after_write=lambda docs: counters.add_unread_notifications(db, docs),
+    profiles=profile_cache
+)
+
+# Pre-ranked discover decks, refilled in the background
+deck_manager = DeckManager(
+    db,
+    deck_size=int(os.environ.get('DECK_SIZE', '200')),
+    refill_threshold=int(os.environ.get('DECK_REFILL_THRESHOLD', '50')),
+    pool_size=int(os.environ.get('DISCOVER_POOL_SIZE', '500')),
+    empty_cooldown=float(os.environ.get('DECK_EMPTY_COOLDOWN_SECONDS', '60'))
+)
+
+# Presence is buffered in memory and flushed to MongoDB in batches. Flushed
+# activity stays overlaid until any cached profile predating it has expired.
+PRESENCE_FLUSH_SECONDS = float(os.environ.get('PRESENCE_FLUSH_SECONDS', '5'))
+presence = PresenceTracker(
+    db,
+    flush_interval=PRESENCE_FLUSH_SECONDS,
+    retain=PROFILE_CACHE_TTL_SECONDS + PRESENCE_FLUSH_SECONDS
+)
+
 security = HTTPBearer()
 
+# Verified tokens, so repeated requests skip jwt.decode
+token_cache = TokenCache(maxsize=int(os.environ.get('TOKEN_CACHE_SIZE', '10000')))
+
+# Opt-in: serialize hot read routes with orjson instead of jsonable_encoder
+FAST_JSON_RESPONSES = os.environ.get('FAST_JSON_RESPONSES', 'false').lower() == 'true'
+
+def respond(content, response: Response = None):
+    """Return `content` as-is, or pre-rendered with orjson in fast JSON mode."""
+    if not FAST_JSON_RESPONSES:
+        return content
+    # A returned Response skips FastAPI's header merge, so carry them over
+    return FastJSONResponse(content, headers=dict(response.headers) if response is not None else None)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Startup finishes, and the server starts accepting requests, only once
+    # the pool is warm and the background tasks are running
+    await warm_up(client, MONGO_MIN_POOL_SIZE)
+    await ensure_indexes(db)
+    presence.start()
+    notification_outbox.start()
+    deck_manager.start()
+    await hub.start()
+    app.state.ready = True
+    try:
+        yield
+    finally:
+        app.state.ready = False
+        await hub.stop()
+        await deck_manager.stop()
+        await presence.stop()
+        await notification_outbox.stop()
+        password_hasher.shutdown()
+        client.close()
+
 # Create the main app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+app.state.ready = False
 api_router = APIRouter(prefix="/api")
 
 # Models
@@ -125,46 +259,54 @@ class SwipeAction(BaseModel):
     to_user_id: str
     action: str
 
+class SwipeBatch(BaseModel):
+    swipes: List[SwipeAction] = Field(..., min_length=1, max_length=100)
+
 class MessageCreate(BaseModel):
     match_id: str
     content: str
 
 # Helper Functions
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+async def hash_password(password: str) -> str:
+    return await password_hasher.hash(password)
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+async def verify_password(password: str, hashed: str) -> bool:
+    return await password_hasher.verify(password, hashed)
 
 def create_token(user_id: str) -> str:
     expire = datetime.now(timezone.utc) + timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
     to_encode = {"sub": user_id, "exp": expire}
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
+def authenticate_token(token: str) -> str:
     try:
-        token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-        
-        # Update online status and last active
-        await db.users.update_one(
-            {"id": user_id},
-            {"$set": {
-                "online": True,
-                "last_active": datetime.now(timezone.utc).isoformat()
-            }}
-        )
+        if token_cache.is_revoked(token):
+            raise HTTPException(status_code=401, detail="Token revoked")
         
+        user_id = token_cache.get(token)
+        if user_id is None:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            user_id = payload.get("sub")
+            if user_id is None:
+                raise HTTPException(status_code=401, detail="Invalid token")
+            if "exp" in payload:
+                token_cache.put(token, user_id, payload["exp"])
         return user_id
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-async def create_notification(user_id: str, notif_type: str, title: str, message: str, data: dict = {}):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
+    user_id = authenticate_token(credentials.credentials)
+    
+    # Record activity; written to the users collection by the next flush
+    presence.touch(user_id)
+    
+    return user_id
+
+def create_notification(user_id: str, notif_type: str, title: str, message: str, data: dict = {}, actor_id: str = None):
+    # `{name}` in message is filled with the actor's name when the outbox writes it
     notification = Notification(
         user_id=user_id,
         type=notif_type,
@@ -172,9 +314,7 @@ async def create_notification(user_id: str, notif_type: str, title: str, message
         message=message,
         data=data
     )
-    doc = notification.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    await db.notifications.insert_one(doc)
+    notification_outbox.enqueue(notification.model_dump(), actor_id=actor_id)
 
 # Auth Routes
 @api_router.post("/auth/register")
@@ -188,9 +328,11 @@ async def register(user_data: UserRegister):
     user_dict = user_data.model_dump(exclude={"password"})
     user_obj = User(**user_dict)
     doc = user_obj.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['last_active'] = doc['last_active'].isoformat()
-    doc['password'] = hash_password(user_data.password)
+    doc['password'] = await hash_password(user_data.password)
+    doc['interest_bits'] = interest_bits(user_data.interests)
+    geo = geocode(user_data.location, user_obj.id)
+    if geo:
+        doc['geo'] = geo
     
     await db.users.insert_one(doc)
     
@@ -200,95 +342,201 @@ async def register(user_data: UserRegister):
 @api_router.post("/auth/login")
 async def login(credentials: UserLogin):
     user = await db.users.find_one({"email": credentials.email})
-    if not user or not verify_password(credentials.password, user['password']):
+    if not user or not await verify_password(credentials.password, user['password']):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    # Upgrade hashes made with a different bcrypt cost
+    if password_hasher.needs_rehash(user['password']):
+        await db.users.update_one(
+            {"id": user['id']},
+            {"$set": {"password": await hash_password(credentials.password)}}
+        )
+    
     # Update online status
-    await db.users.update_one(
-        {"id": user['id']},
-        {"$set": {"online": True, "last_active": datetime.now(timezone.utc).isoformat()}}
-    )
+    presence.touch(user['id'])
     
     token = create_token(user['id'])
     user.pop('password', None)
+    user.pop('interest_bits', None)
     user.pop('_id', None)
-    return {"token": token, "user": user}
+    return {"token": token, "user": presence.apply(user)}
 
 @api_router.post("/auth/logout")
-async def logout(user_id: str = Depends(get_current_user)):
+async def logout(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    user_id: str = Depends(get_current_user)
+):
+    payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+    token_cache.revoke(credentials.credentials, payload.get("exp", 0))
+    presence.forget(user_id)
     await db.users.update_one(
         {"id": user_id},
         {"$set": {"online": False}}
     )
+    profile_cache.invalidate(user_id)
     return {"success": True}
 
 @api_router.get("/auth/me")
 async def get_me(user_id: str = Depends(get_current_user)):
-    user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
+    user = await profile_cache.get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return respond(presence.apply(user))
 
 # User Routes
 @api_router.get("/users/discover")
 async def discover_users(user_id: str = Depends(get_current_user)):
+    # Head of the user's pre-ranked deck
+    return respond(await deck_manager.get(user_id, 50, PROFILE_PROJECTION))
+
+@api_router.get("/users/nearby")
+async def nearby_users(
+    response: Response,
+    radius_km: float = Query(50, gt=0, le=20000),
+    limit: int = Query(50, ge=1, le=100),
+    after: Optional[str] = None,
+    user_id: str = Depends(get_current_user)
+):
     # Get current user
-    current_user = await db.users.find_one({"id": user_id})
+    current_user = await db.users.find_one({"id": user_id}, {"_id": 0, "location": 1, "geo": 1})
     if not current_user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    # Get users already swiped
-    swiped = await db.swipes.find({"from_user_id": user_id}).to_list(1000)
-    swiped_ids = [s['to_user_id'] for s in swiped]
-    swiped_ids.append(user_id)  # Exclude self
+    geo = current_user.get('geo')
+    if geo is None:
+        geo = geocode(current_user.get('location', ""), user_id)
+        if geo is not None:
+            await db.users.update_one({"id": user_id}, {"$set": {"geo": geo}})
     
-    # Get potential matches
-    users = await db.users.find(
-        {"id": {"$nin": swiped_ids}},
-        {"_id": 0, "password": 0}
-    ).to_list(50)
+    if geo is None:
+        # Location not in the city table: fall back to exact location matching,
+        # one unpaginated page with no radius, so it never hands out a cursor
+        if after:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        users = await db.users.find(
+            {"id": {"$ne": user_id}, "location": current_user.get('location')},
+            PROFILE_PROJECTION
+        ).to_list(limit)
+        return respond(users, response)
     
-    return users
-
-@api_router.get("/users/nearby")
-async def nearby_users(user_id: str = Depends(get_current_user)):
-    # Get current user
-    current_user = await db.users.find_one({"id": user_id})
-    if not current_user:
-        raise HTTPException(status_code=404, detail="User not found")
+    # Nearest first within the radius, keyset-paginated on (distance, id).
+    # Points are jittered per user (see geo.py), so distances practically never
+    # tie and $geoNear's own order is the page order.
+    geo_near = {
+        "near": geo,
+        "key": "geo",
+        "distanceField": "distance",
+        "maxDistance": radius_km * 1000,
+        "spherical": True,
+        "query": {"id": {"$ne": user_id}}
+    }
+    pipeline = [{"$geoNear": geo_near}]
+    if after:
+        distance, last_id = decode_cursor(after, 2)
+        if (isinstance(distance, bool) or not isinstance(distance, (int, float))
+                or not math.isfinite(distance) or distance < 0 or not isinstance(last_id, str)):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        geo_near["minDistance"] = distance
+        pipeline.append({"$match": {"$or": [
+            {"distance": {"$gt": distance}},
+            {"distance": distance, "id": {"$gt": last_id}}
+        ]}})
+    pipeline += [
+        # Limit while $geoNear is still streaming, so a page reads limit + 1
+        # users however many are in the radius; the sort only orders the page
+        {"$limit": limit + 1},
+        {"$sort": {"distance": 1, "id": 1}},
+        {"$project": PROFILE_PROJECTION}
+    ]
+    users = await db.users.aggregate(pipeline).to_list(limit + 1)
     
-    # Get users in same location (simplified)
-    users = await db.users.find(
-        {
-            "id": {"$ne": user_id},
-            "location": current_user['location']
-        },
-        {"_id": 0, "password": 0}
-    ).to_list(100)
+    if len(users) > limit:
+        users = users[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(users[-1]['distance'], users[-1]['id'])
+    
+    for user in users:
+        user['distance_km'] = round(user.pop('distance') / 1000, 1)
     
-    return users
+    return respond(users, response)
 
 @api_router.get("/users/{user_id}")
 async def get_user(user_id: str, current_user_id: str = Depends(get_current_user)):
-    user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
+    user = await profile_cache.get(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return respond(presence.apply(user))
 
 @api_router.put("/users/me")
 async def update_profile(user_data: UserUpdate, user_id: str = Depends(get_current_user)):
     update_dict = {k: v for k, v in user_data.model_dump().items() if v is not None}
     
     if update_dict:
-        await db.users.update_one(
-            {"id": user_id},
-            {"$set": update_dict}
-        )
+        update = {"$set": update_dict}
+        if 'interests' in update_dict:
+            update_dict['interest_bits'] = interest_bits(update_dict['interests'])
+        if 'location' in update_dict:
+            geo = geocode(update_dict['location'], user_id)
+            if geo:
+                update_dict['geo'] = geo
+            else:
+                update["$unset"] = {"geo": ""}
+        await db.users.update_one({"id": user_id}, update)
+        profile_cache.invalidate(user_id)
+        # Interests feed the ranking, so rebuild the deck
+        deck_manager.schedule(user_id)
     
-    user = await db.users.find_one({"id": user_id}, {"_id": 0, "password": 0})
-    return user
+    user = await profile_cache.get(user_id)
+    return presence.apply(user)
 
 # Swipe Routes
+def new_match_doc(user_id: str, other_user_id: str, match_id: str) -> dict:
+    match = Match(id=match_id, user1_id=user_id, user2_id=other_user_id)
+    match_doc = match.model_dump()
+    match_doc['pair_key'] = pair_key(user_id, other_user_id)
+    match_doc['last_activity_at'] = match_doc['created_at']
+    return match_doc
+
+async def create_match(user_id: str, other_user_id: str, match_id: str):
+    # Upsert on the pair key so a retried write can never add a second match
+    match_doc = new_match_doc(user_id, other_user_id, match_id)
+    await db.matches.update_one({"pair_key": match_doc['pair_key']}, {"$setOnInsert": match_doc}, upsert=True)
+
+async def notify_match(user_id: str, other_user_id: str, match_id: str):
+    # Create notifications for both users
+    create_notification(
+        user_id,
+        "match",
+        "مطابقة جديدة!",
+        "لديك مطابقة جديدة مع {name}",
+        {"match_id": match_id, "user_id": other_user_id},
+        actor_id=other_user_id
+    )
+    
+    create_notification(
+        other_user_id,
+        "match",
+        "مطابقة جديدة!",
+        "لديك مطابقة جديدة مع {name}",
+        {"match_id": match_id, "user_id": user_id},
+        actor_id=user_id
+    )
+    
+    await hub.publish(user_id, "match", {"match_id": match_id, "user_id": other_user_id})
+    await hub.publish(other_user_id, "match", {"match_id": match_id, "user_id": user_id})
+
+async def notify_like(user_id: str, liked_user_id: str):
+    # Notify the other user they got a like
+    create_notification(
+        liked_user_id,
+        "like",
+        "إعجاب جديد!",
+        "{name} أعجب بك",
+        {"user_id": user_id},
+        actor_id=user_id
+    )
+    
+    await hub.publish(liked_user_id, "like", {"user_id": user_id})
+
 @api_router.post("/swipes")
 async def create_swipe(swipe_data: SwipeAction, user_id: str = Depends(get_current_user)):
     # Create swipe
@@ -297,153 +545,226 @@ async def create_swipe(swipe_data: SwipeAction, user_id: str = Depends(get_curre
         to_user_id=swipe_data.to_user_id,
         action=swipe_data.action
     )
-    doc = swipe.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    await db.swipes.insert_one(doc)
+    await db.swipes.insert_one(swipe.model_dump())
+    await record_swipes(db, user_id, [swipe_data.to_user_id])
+    await deck_manager.consume(user_id, [swipe_data.to_user_id])
     
     # Check for match if it's a like
     is_match = False
     match_id = None
     if swipe_data.action == "like":
-        # Check if other user liked back
-        reverse_swipe = await db.swipes.find_one({
-            "from_user_id": swipe_data.to_user_id,
-            "to_user_id": user_id,
-            "action": "like"
-        })
-        
-        if reverse_swipe:
-            # Create match
-            match = Match(
-                user1_id=user_id,
-                user2_id=swipe_data.to_user_id
-            )
-            match_doc = match.model_dump()
-            match_doc['created_at'] = match_doc['created_at'].isoformat()
-            await db.matches.insert_one(match_doc)
-            is_match = True
-            match_id = match.id
-            
-            # Create notifications for both users
-            current_user = await db.users.find_one({"id": user_id})
-            other_user = await db.users.find_one({"id": swipe_data.to_user_id})
-            
-            await create_notification(
-                user_id,
-                "match",
-                "مطابقة جديدة!",
-                f"لديك مطابقة جديدة مع {other_user['name']}",
-                {"match_id": match_id, "user_id": swipe_data.to_user_id}
-            )
-            
-            await create_notification(
-                swipe_data.to_user_id,
-                "match",
-                "مطابقة جديدة!",
-                f"لديك مطابقة جديدة مع {current_user['name']}",
-                {"match_id": match_id, "user_id": user_id}
-            )
-        else:
-            # Notify the other user they got a like
-            current_user = await db.users.find_one({"id": user_id})
-            await create_notification(
-                swipe_data.to_user_id,
-                "like",
-                "إعجاب جديد!",
-                f"{current_user['name']} أعجب بك",
-                {"user_id": user_id}
-            )
+        # The pair document decides atomically whether this like made the match
+        match_id, created = await record_like(db, user_id, swipe_data.to_user_id)
+        is_match = match_id is not None
+        # The pair is claimed before the match is written; upserting on every
+        # matched like repairs a match whose write never happened
+        if is_match:
+            await create_match(user_id, swipe_data.to_user_id, match_id)
+        if created:
+            await notify_match(user_id, swipe_data.to_user_id, match_id)
+        elif not is_match:
+            await notify_like(user_id, swipe_data.to_user_id)
     
     return {"success": True, "is_match": is_match, "match_id": match_id}
 
+@api_router.post("/swipes/batch")
+async def create_swipes_batch(batch: SwipeBatch, user_id: str = Depends(get_current_user)):
+    # Write every swipe in one round trip, in the order given
+    docs = []
+    for swipe_data in batch.swipes:
+        swipe = Swipe(
+            from_user_id=user_id,
+            to_user_id=swipe_data.to_user_id,
+            action=swipe_data.action
+        )
+        docs.append(swipe.model_dump())
+    await db.swipes.bulk_write([InsertOne(doc) for doc in docs], ordered=True)
+    
+    target_ids = [swipe_data.to_user_id for swipe_data in batch.swipes]
+    await record_swipes(db, user_id, target_ids)
+    await deck_manager.consume(user_id, target_ids)
+    
+    # Resolve every like against its pair document in one bulk write
+    liked_ids = [s.to_user_id for s in batch.swipes if s.action == "like"]
+    pairs = await record_likes(db, user_id, liked_ids)
+    
+    results = []
+    for swipe_data in batch.swipes:
+        match_id = pairs.get(swipe_data.to_user_id, (None, False))[0] if swipe_data.action == "like" else None
+        results.append({"to_user_id": swipe_data.to_user_id, "is_match": match_id is not None, "match_id": match_id})
+    
+    # Upsert every matched pair, not just new ones, as in create_swipe
+    matched = {target_id: match_id for target_id, (match_id, _) in pairs.items() if match_id is not None}
+    if matched:
+        match_docs = [new_match_doc(user_id, target_id, match_id) for target_id, match_id in matched.items()]
+        await db.matches.bulk_write([
+            UpdateOne({"pair_key": doc['pair_key']}, {"$setOnInsert": doc}, upsert=True) for doc in match_docs
+        ], ordered=False)
+    
+    # Notifications go through the outbox, which batches them too
+    for target_id, (match_id, was_created) in pairs.items():
+        if was_created:
+            await notify_match(user_id, target_id, match_id)
+        elif match_id is None:
+            await notify_like(user_id, target_id)
+    
+    return {"success": True, "results": results}
+
 @api_router.get("/swipes/likes-me")
-async def get_likes_me(user_id: str = Depends(get_current_user)):
-    # Get all likes to this user
-    likes = await db.swipes.find({
-        "to_user_id": user_id,
-        "action": "like"
-    }).to_list(1000)
+async def get_likes_me(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    after: Optional[str] = None,
+    user_id: str = Depends(get_current_user)
+):
+    # Incoming likes, newest first, keyset-paginated on (created_at, id)
+    query = {"to_user_id": user_id, "action": "like"}
+    if after:
+        query.update(keyset_before(*decode_cursor(after, 2)))
+    
+    # Anti-join in the database: drop likers this user already liked back
+    likes = await db.swipes.aggregate([
+        {"$match": query},
+        {"$sort": {"created_at": -1, "id": -1}},
+        {"$lookup": {
+            "from": "swipes",
+            "let": {"liker_id": "$from_user_id"},
+            "pipeline": [
+                {"$match": {
+                    "from_user_id": user_id,
+                    "action": "like",
+                    "$expr": {"$eq": ["$to_user_id", "$$liker_id"]}
+                }},
+                {"$limit": 1},
+                {"$project": {"_id": 1}}
+            ],
+            "as": "liked_back"
+        }},
+        {"$match": {"liked_back": {"$size": 0}}},
+        {"$limit": limit + 1},
+        {"$project": {"_id": 0, "id": 1, "from_user_id": 1, "created_at": 1}}
+    ]).to_list(limit + 1)
     
-    # Check which ones are not matched yet
-    my_likes = await db.swipes.find({"from_user_id": user_id}).to_list(1000)
-    my_liked_ids = [s['to_user_id'] for s in my_likes if s['action'] == 'like']
+    if len(likes) > limit:
+        likes = likes[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(likes[-1]['created_at'], likes[-1]['id'])
     
-    # Filter out already matched
-    unmatched_likes = [like_item for like_item in likes if like_item['from_user_id'] not in my_liked_ids]
+    # Get user details in one query
+    users = await db.users.find(
+        {"id": {"$in": list({like['from_user_id'] for like in likes})}},
+        PROFILE_PROJECTION
+    ).to_list(None)
+    users_by_id = {u['id']: u for u in users}
     
-    # Get user details
     result = []
-    for like in unmatched_likes:
-        user = await db.users.find_one({"id": like['from_user_id']}, {"_id": 0, "password": 0})
+    for like in likes:
+        user = users_by_id.get(like['from_user_id'])
         if user:
             result.append({
                 "user": user,
                 "liked_at": like['created_at']
             })
     
-    return result
+    return respond(result, response)
 
 # Match Routes
 @api_router.get("/matches")
-async def get_matches(user_id: str = Depends(get_current_user)):
-    # Find all matches for this user
-    matches = await db.matches.find({
-        "$or": [
-            {"user1_id": user_id},
-            {"user2_id": user_id}
-        ]
-    }, {"_id": 0}).to_list(1000)
-    
-    # Get user details for each match
+async def get_matches(
+    response: Response,
+    limit: int = Query(50, ge=1, le=100),
+    after: Optional[str] = None,
+    user_id: str = Depends(get_current_user)
+):
+    # Most recent activity first, keyset-paginated on (last_activity_at, id).
+    # The match carries its own last message and unread counts.
+    query = {"$or": [{"user1_id": user_id}, {"user2_id": user_id}]}
+    if after:
+        query = {"$and": [query, keyset_before(*decode_cursor(after, 2), field="last_activity_at")]}
+    matches = await db.matches.find(query, {"_id": 0}).sort(
+        [("last_activity_at", -1), ("id", -1)]
+    ).to_list(limit + 1)
+    
+    if len(matches) > limit:
+        matches = matches[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(matches[-1].get('last_activity_at'), matches[-1]['id'])
+    
+    if not matches:
+        return []
+    
+    other_ids = {
+        match['id']: match['user2_id'] if match['user1_id'] == user_id else match['user1_id']
+        for match in matches
+    }
+    users = await db.users.find(
+        {"id": {"$in": list(set(other_ids.values()))}},
+        PROFILE_PROJECTION
+    ).to_list(None)
+    users_by_id = {u['id']: u for u in users}
+    
     result = []
     for match in matches:
-        other_user_id = match['user2_id'] if match['user1_id'] == user_id else match['user1_id']
-        user = await db.users.find_one({"id": other_user_id}, {"_id": 0, "password": 0})
+        user = users_by_id.get(other_ids[match['id']])
         if user:
-            # Get last message
-            last_msg = await db.messages.find_one(
-                {"match_id": match['id']},
-                {"_id": 0},
-                sort=[("created_at", -1)]
-            )
-            
-            # Get unread count
-            unread_count = await db.messages.count_documents({
-                "match_id": match['id'],
-                "sender_id": other_user_id,
-                "read": False
-            })
-            
             result.append({
                 "match_id": match['id'],
                 "user": user,
-                "last_message": last_msg,
-                "unread_count": unread_count,
-                "matched_at": match['created_at']
+                "last_message": match.get('last_message'),
+                "unread_count": match.get('unread', {}).get(user_id, 0),
+                "matched_at": match['created_at'],
+                "last_activity_at": match.get('last_activity_at', match['created_at'])
             })
     
-    return result
+    return respond(result, response)
 
 # Message Routes
 @api_router.get("/messages/{match_id}")
-async def get_messages(match_id: str, user_id: str = Depends(get_current_user)):
+async def get_messages(
+    match_id: str,
+    response: Response,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    user_id: str = Depends(get_current_user)
+):
+    if before and after:
+        raise HTTPException(status_code=400, detail="Use either before or after, not both")
+    
     # Verify user is part of this match
     match = await db.matches.find_one({"id": match_id})
     if not match or (match['user1_id'] != user_id and match['user2_id'] != user_id):
         raise HTTPException(status_code=403, detail="Access denied")
     
-    # Mark messages as read
-    await db.messages.update_many(
-        {"match_id": match_id, "sender_id": {"$ne": user_id}},
-        {"$set": {"read": True}}
-    )
+    # Keyset pagination on (created_at, id); defaults to the newest page.
+    # Pages are always returned oldest first.
+    query = {"match_id": match_id}
+    if after:
+        query.update(keyset_after(*decode_cursor(after, 2)))
+        messages = await db.messages.find(query, {"_id": 0}).sort(
+            [("created_at", 1), ("id", 1)]
+        ).to_list(limit)
+        has_older = True
+    else:
+        if before:
+            query.update(keyset_before(*decode_cursor(before, 2)))
+        messages = await db.messages.find(query, {"_id": 0}).sort(
+            [("created_at", -1), ("id", -1)]
+        ).to_list(limit + 1)
+        has_older = len(messages) > limit
+        messages = messages[:limit][::-1]
     
-    messages = await db.messages.find(
-        {"match_id": match_id},
-        {"_id": 0}
-    ).sort("created_at", 1).to_list(1000)
+    if messages:
+        if has_older:
+            response.headers["X-Before-Cursor"] = encode_cursor(messages[0]['created_at'], messages[0]['id'])
+        response.headers["X-After-Cursor"] = encode_cursor(messages[-1]['created_at'], messages[-1]['id'])
+    elif after:
+        response.headers["X-After-Cursor"] = after
+    
+    # Opening the newest messages moves this member's read watermark up to them
+    if messages and not before:
+        await counters.mark_messages_read(db, match, user_id, messages[-1]['created_at'])
+    counters.apply_read_state(match, messages)
     
-    return messages
+    return respond(messages, response)
 
 @api_router.post("/messages")
 async def send_message(msg_data: MessageCreate, user_id: str = Depends(get_current_user)):
@@ -458,21 +779,26 @@ async def send_message(msg_data: MessageCreate, user_id: str = Depends(get_curre
         content=msg_data.content
     )
     doc = message.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.messages.insert_one(doc)
     
-    # Create notification for the other user
     other_user_id = match['user2_id'] if match['user1_id'] == user_id else match['user1_id']
-    current_user = await db.users.find_one({"id": user_id})
+    await counters.add_message(db, doc, other_user_id)
     
-    await create_notification(
+    # Create notification for the other user
+    create_notification(
         other_user_id,
         "message",
         "رسالة جديدة",
-        f"رسالة جديدة من {current_user['name']}",
-        {"match_id": msg_data.match_id, "message": msg_data.content}
+        "رسالة جديدة من {name}",
+        {"match_id": msg_data.match_id, "message": msg_data.content},
+        actor_id=user_id
     )
     
+    # Push to both members so the sender's other devices stay in sync
+    event = message.model_dump(mode="json")
+    await hub.publish(other_user_id, "message", event)
+    await hub.publish(user_id, "message", event)
+    
     return message
 
 # Notification Routes
@@ -483,32 +809,57 @@ async def get_notifications(user_id: str = Depends(get_current_user)):
         {"_id": 0}
     ).sort("created_at", -1).to_list(100)
     
-    return notifications
+    return respond(notifications)
 
 @api_router.get("/notifications/unread-count")
 async def get_unread_count(user_id: str = Depends(get_current_user)):
-    count = await db.notifications.count_documents({
-        "user_id": user_id,
-        "read": False
-    })
+    count = await counters.get_unread_notifications(db, user_id)
     return {"count": count}
 
 @api_router.put("/notifications/{notification_id}/read")
 async def mark_notification_read(notification_id: str, user_id: str = Depends(get_current_user)):
-    await db.notifications.update_one(
-        {"id": notification_id, "user_id": user_id},
-        {"$set": {"read": True}}
-    )
+    await counters.read_notification(db, user_id, notification_id)
     return {"success": True}
 
 @api_router.put("/notifications/read-all")
 async def mark_all_notifications_read(user_id: str = Depends(get_current_user)):
-    await db.notifications.update_many(
-        {"user_id": user_id},
-        {"$set": {"read": True}}
-    )
+    await counters.read_all_notifications(db, user_id)
     return {"success": True}
 
+# Real-time Routes
+@api_router.websocket("/ws")
+async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = None):
+    # Browsers can't set headers on a websocket, so accept ?token= as well
+    if token is None:
+        scheme, _, token = websocket.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer":
+            token = None
+    try:
+        user_id = authenticate_token(token or "")
+    except HTTPException:
+        await websocket.close(code=1008)
+        return
+    
+    presence.touch(user_id)
+    await websocket.accept()
+    await hub.serve(websocket, user_id)
+
+# Health Routes
+@api_router.get("/health/ready")
+async def readiness():
+    pools = pool_monitor.stats()
+    waiting = max((pool["wait_queue"] for pool in pools.values()), default=0)
+    if not app.state.ready:
+        status = "not_ready"
+    elif waiting > MONGO_READY_MAX_WAIT_QUEUE:
+        status = "saturated"
+    else:
+        status = "ready"
+    return JSONResponse(
+        {"status": status, "max_wait_queue": MONGO_READY_MAX_WAIT_QUEUE, "pools": pools},
+        status_code=200 if status == "ready" else 503,
+    )
+
 # Include router
 app.include_router(api_router)
 
@@ -518,14 +869,36 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    # Page cursors travel in headers, which cross-origin clients can only read if exposed
+    expose_headers=["X-Next-Cursor", "X-Before-Cursor", "X-After-Cursor"],
 )
 
+# Per-route latency, size and status metrics, scraped from /metrics
+request_metrics = RequestMetrics()
+# Opt-in: X-Mongo-Round-Trips / X-Mongo-Time-Ms on every response, for tests and profiling
+MONGO_DEBUG_HEADERS = os.environ.get('MONGO_DEBUG_HEADERS', 'false').lower() == 'true'
+app.add_middleware(MetricsMiddleware, metrics=request_metrics, debug_headers=MONGO_DEBUG_HEADERS)
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    gauges = {
+        "websocket_connections": hub.connection_count(),
+        "password_hash_pending": password_hasher.pending,
+        "deck_refills_pending": deck_manager.pending(),
+    }
+    for prefix, stats in (
+        ("token_cache", token_cache.stats()),
+        ("profile_cache", profile_cache.stats()),
+        ("notification_outbox", notification_outbox.stats()),
+    ):
+        gauges.update({f"{prefix}_{name}": value for name, value in stats.items()})
+    pools = pool_monitor.stats().values()
+    for name in ("connections", "checked_out", "wait_queue", "checkout_failures"):
+        gauges[f"mongodb_pool_{name}"] = sum(pool[name] for pool in pools)
+    return PlainTextResponse(request_metrics.render(gauges, command_monitor.totals()), media_type="text/plain; version=0.0.4")
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
-logger = logging.getLogger(__name__)
-
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+logger = logging.getLogger(__name__)
\ No newline at end of file
@@ -0,0 +1,67 @@
+import hashlib
+import time
+from collections import OrderedDict
+
+
+class TokenCache:
+    """
+    Bounded LRU of already-verified JWTs keyed by their SHA-256 digest, so a
+    token polled hundreds of times only pays for signature verification once.
+    Entries never outlive the token's `exp`. Revoked tokens go on an in-memory
+    denylist that is consulted before the cache and pruned as tokens expire.
+    """
+
+    def __init__(self, maxsize: int = 10000):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._revoked = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode('utf-8')).digest()
+
+    def is_revoked(self, token: str) -> bool:
+        expires_at = self._revoked.get(self.digest(token))
+        return expires_at is not None and expires_at > time.time()
+
+    def get(self, token: str):
+        key = self.digest(token)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        user_id, expires_at = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return user_id
+
+    def put(self, token: str, user_id: str, expires_at: float):
+        key = self.digest(token)
+        self._entries[key] = (user_id, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def revoke(self, token: str, expires_at: float):
+        now = time.time()
+        key = self.digest(token)
+        self._entries.pop(key, None)
+        self._revoked[key] = expires_at
+        if len(self._revoked) > self.maxsize:
+            self._revoked = {k: exp for k, exp in self._revoked.items() if exp > now}
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "revoked": len(self._revoked),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+import decks
+from decks import DeckManager
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeDecks:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query, projection=None):
+        doc = self.docs.get(query["user_id"])
+        return dict(doc) if doc is not None else None
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.get(query["user_id"])
+        if doc is None:
+            if not upsert:
+                return
+            doc = self.docs[query["user_id"]] = {"user_id": query["user_id"]}
+        doc.update(update.get("$set", {}))
+        if "$pullAll" in update:
+            removed = set(update["$pullAll"]["candidates"])
+            doc["candidates"] = [i for i in doc.get("candidates", []) if i not in removed]
+
+
+class FakeUsers:
+    def __init__(self, ids):
+        self.docs = {i: {"id": i, "age": 25, "interests": []} for i in ids}
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query["id"])
+
+    def find(self, query, projection=None):
+        return FakeCursor([self.docs[i] for i in query["id"]["$in"] if i in self.docs])
+
+
+class FakeSwipes:
+    def find(self, query, projection=None):
+        return FakeCursor([])
+
+
+class FakeDb:
+    def __init__(self, user_ids):
+        self.decks = FakeDecks()
+        self.users = FakeUsers(user_ids)
+        self.swipes = FakeSwipes()
+
+
+@pytest.fixture
+def unseen(monkeypatch):
+    """Ids find_unseen_users returns; tests remove them as the user swipes."""
+    pool = []
+
+    async def find_unseen_users(db, user_id, limit, projection):
+        return [db.users.docs[i] for i in pool[:limit] if i != user_id]
+
+    monkeypatch.setattr(decks, "find_unseen_users", find_unseen_users)
+    return pool
+
+
+def manager(db, **kwargs):
+    return DeckManager(db, deck_size=50, refill_threshold=10, pool_size=100, **kwargs)
+
+
+def test_exhausted_deck_is_not_refilled_inline_during_cooldown(unseen):
+    async def scenario():
+        db = FakeDb(["me"])
+        deck_manager = manager(db)
+        refills = 0
+        refill = deck_manager.refill
+
+        async def counting(user_id):
+            nonlocal refills
+            refills += 1
+            return await refill(user_id)
+
+        deck_manager.refill = counting
+        for _ in range(3):
+            assert await deck_manager.get("me", 10, {}) == []
+        assert refills == 1
+        assert db.decks.docs["me"]["exhausted"] is True
+
+    asyncio.run(scenario())
+
+
+def test_exhausted_deck_is_refilled_after_cooldown(unseen):
+    async def scenario():
+        db = FakeDb(["me", "sara"])
+        deck_manager = manager(db, empty_cooldown=0)
+        assert await deck_manager.get("me", 10, {}) == []
+        unseen.append("sara")
+        assert [u["id"] for u in await deck_manager.get("me", 10, {})] == ["sara"]
+        assert db.decks.docs["me"]["exhausted"] is False
+
+    asyncio.run(scenario())
+
+
+def test_deck_used_up_by_swipes_is_refilled_inline(unseen):
+    async def scenario():
+        ids = [f"user-{i:03}" for i in range(300)]
+        db = FakeDb(["me", *ids])
+        unseen.extend(ids)
+        deck_manager = manager(db)
+        assert len(await deck_manager.get("me", 10, {})) == 10
+
+        swiped = db.decks.docs["me"]["candidates"]
+        await deck_manager.consume("me", list(swiped))
+        del unseen[:len(swiped)]
+        assert db.decks.docs["me"]["candidates"] == []
+
+        page = await deck_manager.get("me", 10, {})
+        assert len(page) == 10
+        assert not {u["id"] for u in page} & set(swiped)
+
+    asyncio.run(scenario())
@@ -0,0 +1,44 @@
+import math
+
+import pytest
+
+from geo import JITTER_METERS, METERS_PER_DEGREE, geocode, normalize_place
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("  Cairo ,Egypt ", "cairo, egypt"),
+    ("Zürich", "zurich"),
+    ("São   Paulo", "sao paulo"),
+    ("دبي، الإمارات", "دبي, الامارات"),
+    ("القاهـرة", "القاهره"),
+    ("مكة", "مكه"),
+    ("أبو ظبى", "ابو ظبي"),
+])
+def test_normalize_place(text, expected):
+    assert normalize_place(text) == expected
+
+
+def test_geocode_tries_the_city_before_the_comma():
+    assert geocode("Cairo, Egypt") == geocode("cairo")
+    assert geocode("Cairo, Somewhere Else") == geocode("Cairo")
+
+
+def test_geocode_unknown_or_empty():
+    assert geocode("") is None
+    assert geocode("Atlantis") is None
+    assert geocode("Atlantis", "user-1") is None
+
+
+def test_user_points_are_stable_and_near_the_centre():
+    centre_lon, centre_lat = geocode("Cairo")["coordinates"]
+    distances = set()
+    for i in range(500):
+        point = geocode("Cairo", f"user-{i}")
+        assert point == geocode("Cairo", f"user-{i}")
+        lon, lat = point["coordinates"]
+        north = (lat - centre_lat) * METERS_PER_DEGREE
+        east = (lon - centre_lon) * METERS_PER_DEGREE * math.cos(math.radians(centre_lat))
+        distance = math.hypot(north, east)
+        assert distance <= JITTER_METERS + 1
+        distances.add(round(distance, 3))
+    assert len(distances) == 500
@@ -0,0 +1,82 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from metrics import MetricsMiddleware, RequestMetrics
+from mongo_monitor import CommandMonitor, assert_max_round_trips, current_stats, round_trips, track_commands
+
+
+def event(name: str, micros: int = 1500):
+    return SimpleNamespace(command_name=name, duration_micros=micros)
+
+
+@pytest.fixture
+def app():
+    monitor = CommandMonitor()
+    metrics = RequestMetrics()
+    app = FastAPI()
+
+    @app.get("/api/things/{thing_id}")
+    async def get_thing(thing_id: str, commands: int = 2):
+        monitor.succeeded(event("find"))
+        # Motor runs the driver on an executor thread with a copy of the context
+        for _ in range(commands - 1):
+            await asyncio.to_thread(monitor.succeeded, event("getMore"))
+        return {"id": thing_id}
+
+    app.add_middleware(MetricsMiddleware, metrics=metrics, debug_headers=True)
+    app.state.monitor = monitor
+    app.state.metrics = metrics
+    return app
+
+
+def test_commands_are_counted_per_request(app):
+    client = TestClient(app)
+    response = client.get("/api/things/a", params={"commands": 3})
+    assert round_trips(response) == 3
+    assert response.headers["X-Mongo-Time-Ms"] == "4.50"
+    assert round_trips(client.get("/api/things/b", params={"commands": 1})) == 1
+    assert current_stats.get() is None
+
+
+def test_assert_max_round_trips(app):
+    response = TestClient(app).get("/api/things/a", params={"commands": 3})
+    assert_max_round_trips(response, 3)
+    with pytest.raises(AssertionError, match="GET /api/things/a made 3 MongoDB round trips, expected at most 2"):
+        assert_max_round_trips(response, 2)
+
+
+def test_missing_header_is_an_assertion_error():
+    app = FastAPI()
+    app.get("/ping")(lambda: {})
+    with pytest.raises(AssertionError, match="MONGO_DEBUG_HEADERS"):
+        round_trips(TestClient(app).get("/ping"))
+
+
+def test_metrics_record_round_trips_by_route(app):
+    client = TestClient(app)
+    client.get("/api/things/a", params={"commands": 3})
+    client.get("/api/things/b", params={"commands": 3})
+    rendered = app.state.metrics.render(mongo_commands=app.state.monitor.totals())
+    labels = 'method="GET",route="/api/things/{thing_id}"'
+    assert f'http_request_mongo_round_trips_sum{{{labels}}} 6' in rendered
+    assert f'http_request_mongo_round_trips_bucket{{{labels},le="2"}} 0' in rendered
+    assert f'http_request_mongo_round_trips_bucket{{{labels},le="3"}} 2' in rendered
+    assert 'mongodb_commands_total{command="find"} 2' in rendered
+    assert 'mongodb_commands_total{command="getMore"} 4' in rendered
+
+
+def test_commands_outside_a_request_only_count_in_totals():
+    monitor = CommandMonitor()
+    monitor.failed(event("insert", 2000))
+    assert monitor.totals() == {"insert": (1, 0.002)}
+
+    with track_commands() as stats:
+        monitor.succeeded(event("find"))
+        monitor.succeeded(event("find"))
+    monitor.succeeded(event("find"))
+    assert (stats.commands, stats.duration_micros) == (2, 3000)
+    assert monitor.totals()["find"] == (3, 0.0045)
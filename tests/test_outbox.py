@@ -0,0 +1,108 @@
+import asyncio
+
+from outbox import NotificationOutbox
+
+
+class FakeNotifications:
+    def __init__(self):
+        self.docs = []
+        self.failures = 0
+        self.release = asyncio.Event()
+        self.release.set()
+        self.started = asyncio.Event()
+
+    async def insert_many(self, docs, ordered=True):
+        self.started.set()
+        await self.release.wait()
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("write failed")
+        self.docs.extend(docs)
+
+
+class FakeCards:
+    async def get_cards(self, user_ids):
+        return {user_id: {"name": user_id.title()} for user_id in user_ids}
+
+
+class FakeDb:
+    def __init__(self):
+        self.notifications = FakeNotifications()
+
+
+def notification(i: int) -> dict:
+    return {"id": f"n{i}", "user_id": "sara", "message": "{name} liked you"}
+
+
+def test_names_are_resolved_at_write_time():
+    async def scenario():
+        db = FakeDb()
+        outbox = NotificationOutbox(db, profiles=FakeCards())
+        outbox.enqueue(notification(1), actor_id="omar")
+        outbox.enqueue({"id": "n2", "user_id": "sara", "message": "Welcome"})
+        assert await outbox.flush() == 2
+        assert [doc["message"] for doc in db.notifications.docs] == ["Omar liked you", "Welcome"]
+
+    asyncio.run(scenario())
+
+
+def test_failed_batches_are_retried_then_dropped():
+    async def scenario():
+        db = FakeDb()
+        outbox = NotificationOutbox(db, max_attempts=2, profiles=FakeCards())
+        outbox.enqueue(notification(1))
+        db.notifications.failures = 1
+        assert await outbox.flush() == 0
+        assert await outbox.flush() == 1
+        assert outbox.stats()["retried"] == 1
+
+        outbox.enqueue(notification(2))
+        db.notifications.failures = 2
+        await outbox.flush()
+        await outbox.flush()
+        assert outbox.stats()["dropped"] == 1
+        assert outbox.depth == 0
+
+    asyncio.run(scenario())
+
+
+def test_stop_during_a_flush_writes_the_batch():
+    async def scenario():
+        db = FakeDb()
+        outbox = NotificationOutbox(db, batch_size=5, flush_interval=60, profiles=FakeCards())
+        outbox.start()
+        db.notifications.release.clear()
+        for i in range(5):
+            outbox.enqueue(notification(i))
+        await db.notifications.started.wait()
+        outbox.enqueue(notification(5))
+
+        stopping = asyncio.create_task(outbox.stop())
+        await asyncio.sleep(0)
+        db.notifications.release.set()
+        await stopping
+
+        assert [doc["id"] for doc in db.notifications.docs] == [f"n{i}" for i in range(6)]
+        assert outbox.stats() == {"depth": 0, "enqueued": 6, "written": 6, "retried": 0, "dropped": 0}
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_flush_puts_the_batch_back():
+    async def scenario():
+        db = FakeDb()
+        outbox = NotificationOutbox(db, profiles=FakeCards())
+        for i in range(3):
+            outbox.enqueue(notification(i))
+        db.notifications.release.clear()
+        flush = asyncio.create_task(outbox.flush())
+        await db.notifications.started.wait()
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+        assert outbox.depth == 3
+        assert outbox.stats()["retried"] == 0
+
+        db.notifications.release.set()
+        assert await outbox.flush() == 3
+
+    asyncio.run(scenario())
@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from pagination import decode_cursor, encode_cursor, keyset_after, keyset_before
+
+
+def test_cursor_round_trips_datetimes_and_ids():
+    created_at = datetime(2025, 10, 21, 12, 30, 15, 123000, tzinfo=timezone.utc)
+    cursor = encode_cursor(created_at, "match-1")
+    assert decode_cursor(cursor, 2) == [created_at, "match-1"]
+
+
+def test_cursor_round_trips_numbers():
+    assert decode_cursor(encode_cursor(1234.5, "user-9"), 2) == [1234.5, "user-9"]
+
+
+def test_cursor_is_url_safe():
+    cursor = encode_cursor("ü" * 40, "?&/+=")
+    assert all(ch.isalnum() or ch in "-_" for ch in cursor)
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    encode_cursor("only-one"),
+    encode_cursor({"$where": "1"}, "id"),
+    encode_cursor({"$date": 5}, "id"),
+    encode_cursor({"$date": "yesterday"}, "id"),
+])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor, 2)
+    assert error.value.status_code == 400
+
+
+def test_keyset_filters_break_ties_on_id():
+    assert keyset_before(5, "b") == {"$or": [{"created_at": {"$lt": 5}}, {"created_at": 5, "id": {"$lt": "b"}}]}
+    assert keyset_after(5, "b", field="liked_at") == {
+        "$or": [{"liked_at": {"$gt": 5}}, {"liked_at": 5, "id": {"$gt": "b"}}]
+    }
@@ -0,0 +1,172 @@
+import asyncio
+import os
+import uuid
+from functools import lru_cache
+
+import pytest
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import PyMongoError
+
+from pairs import pair_key, record_like, record_likes
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+
+
+@lru_cache(maxsize=1)
+def mongodb_available() -> bool:
+    probe = MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+    try:
+        probe.admin.command("ping")
+        return True
+    except PyMongoError:
+        return False
+    finally:
+        probe.close()
+
+
+def evaluate(expression, doc):
+    # The aggregation expressions _like_pipeline uses
+    if isinstance(expression, str) and expression.startswith("$"):
+        return doc.get(expression[1:])
+    if isinstance(expression, list):
+        return [evaluate(item, doc) for item in expression]
+    if isinstance(expression, dict):
+        (operator, args), = expression.items()
+        if operator == "$ifNull":
+            value = evaluate(args[0], doc)
+            return value if value is not None else evaluate(args[1], doc)
+        if operator == "$cond":
+            return evaluate(args[1] if evaluate(args[0], doc) else args[2], doc)
+        if operator == "$and":
+            return all(evaluate(arg, doc) for arg in args)
+        raise NotImplementedError(operator)
+    return expression
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakePairs:
+    """A pairs collection applying pipeline updates atomically, as MongoDB does per document."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def _apply(self, key, pipeline):
+        # Yield first so concurrent callers interleave between updates
+        await asyncio.sleep(0)
+        doc = dict(self.docs.get(key, {"key": key}))
+        for stage in pipeline:
+            (operator, fields), = stage.items()
+            assert operator == "$set"
+            doc.update({field: evaluate(value, doc) for field, value in fields.items()})
+        self.docs[key] = doc
+        return doc
+
+    async def find_one_and_update(self, query, pipeline, upsert, return_document, projection):
+        assert upsert and return_document == ReturnDocument.AFTER
+        doc = await self._apply(query["key"], pipeline)
+        return {field: doc[field] for field in projection if field in doc}
+
+    async def bulk_write(self, operations, ordered=True):
+        for operation in operations:
+            await self._apply(operation._filter["key"], operation._doc)
+
+    def find(self, query, projection):
+        return FakeCursor([dict(self.docs[key]) for key in query["key"]["$in"] if key in self.docs])
+
+
+class FakeDb:
+    def __init__(self):
+        self.pairs = FakePairs()
+
+
+@pytest.fixture(params=["fake", "mongodb"])
+def run(request):
+    """Runs a scenario against the fake collection, and against MongoDB when one answers."""
+    if request.param == "fake":
+        return lambda scenario: asyncio.run(scenario(FakeDb()))
+
+    if not mongodb_available():
+        pytest.skip(f"no MongoDB at {MONGO_URL}")
+    db_name = f"pizoo_test_{uuid.uuid4().hex[:8]}"
+
+    def drop():
+        with MongoClient(MONGO_URL) as client:
+            client.drop_database(db_name)
+    request.addfinalizer(drop)
+
+    def run_on_mongodb(scenario):
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        async def main():
+            client = AsyncIOMotorClient(MONGO_URL)
+            db = client[db_name]
+            await db.pairs.create_index("key", unique=True)
+            try:
+                await scenario(db)
+            finally:
+                client.close()
+        asyncio.run(main())
+    return run_on_mongodb
+
+
+def test_pair_key_is_symmetric():
+    assert pair_key("b", "a") == pair_key("a", "b") == "a|b"
+
+
+def test_match_is_claimed_only_once_both_sides_like(run):
+    async def scenario(db):
+        assert await record_like(db, "sara", "omar") == (None, False)
+        match_id, created = await record_like(db, "omar", "sara")
+        assert match_id is not None and created
+        assert await record_like(db, "sara", "omar") == (match_id, False)
+        assert await record_like(db, "omar", "sara") == (match_id, False)
+
+    run(scenario)
+
+
+def test_repeated_likes_from_one_side_never_match(run):
+    async def scenario(db):
+        for _ in range(3):
+            assert await record_like(db, "sara", "omar") == (None, False)
+
+    run(scenario)
+
+
+def test_simultaneous_likes_create_one_match(run):
+    async def scenario(db):
+        results = await asyncio.gather(*(
+            record_like(db, *(("sara", "omar") if i % 2 else ("omar", "sara"))) for i in range(10)
+        ))
+        match_ids = {match_id for match_id, _ in results if match_id is not None}
+        assert len(match_ids) == 1
+        assert sum(created for _, created in results) == 1
+
+    run(scenario)
+
+
+def test_batch_matches_single_likes(run):
+    async def scenario(db):
+        for other in ("omar", "mira"):
+            await record_like(db, other, "sara")
+        await record_like(db, "layla", "sara")
+        _, created = await record_like(db, "sara", "layla")
+        assert created
+
+        results = await record_likes(db, "sara", ["omar", "mira", "nour", "layla", "omar"])
+        assert set(results) == {"omar", "mira", "nour", "layla"}
+        assert results["nour"] == (None, False)
+        for other in ("omar", "mira"):
+            match_id, created = results[other]
+            assert match_id is not None and created
+            assert await record_like(db, "sara", other) == (match_id, False)
+        layla_match, created = results["layla"]
+        assert layla_match is not None and not created
+
+    run(scenario)
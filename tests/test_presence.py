@@ -0,0 +1,75 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from presence import PresenceTracker
+
+
+class FakeUsers:
+    def __init__(self):
+        self.writes = {}
+        self.release = asyncio.Event()
+        self.release.set()
+        self.started = asyncio.Event()
+
+    async def bulk_write(self, operations, ordered=True):
+        self.started.set()
+        await self.release.wait()
+        for operation in operations:
+            self.writes[operation._filter["id"]] = operation._doc["$set"]["last_active"]
+
+
+class FakeDb:
+    def __init__(self):
+        self.users = FakeUsers()
+
+
+def test_apply_overlays_pending_and_recently_flushed_activity():
+    async def scenario():
+        tracker = PresenceTracker(FakeDb(), retain=60)
+        stale = {"id": "sara", "online": False, "last_active": datetime.now(timezone.utc) - timedelta(hours=1)}
+        tracker.touch("sara")
+        assert tracker.apply(dict(stale))["online"] is True
+        assert await tracker.flush() == 1
+        assert tracker.apply(dict(stale))["online"] is True
+        tracker.forget("sara")
+        assert tracker.apply(dict(stale))["online"] is False
+
+    asyncio.run(scenario())
+
+
+def test_stop_during_a_flush_writes_everything():
+    async def scenario():
+        db = FakeDb()
+        tracker = PresenceTracker(db, flush_interval=0.01)
+        tracker.start()
+        db.users.release.clear()
+        tracker.touch("sara")
+        tracker.touch("omar")
+        await db.users.started.wait()
+        tracker.touch("mira")
+
+        stopping = asyncio.create_task(tracker.stop())
+        await asyncio.sleep(0)
+        db.users.release.set()
+        await stopping
+        assert sorted(db.users.writes) == ["mira", "omar", "sara"]
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_flush_keeps_the_batch_pending():
+    async def scenario():
+        db = FakeDb()
+        tracker = PresenceTracker(db)
+        tracker.touch("sara")
+        db.users.release.clear()
+        flush = asyncio.create_task(tracker.flush())
+        await db.users.started.wait()
+        flush.cancel()
+        await asyncio.gather(flush, return_exceptions=True)
+
+        db.users.release.set()
+        assert await tracker.flush() == 1
+        assert list(db.users.writes) == ["sara"]
+
+    asyncio.run(scenario())
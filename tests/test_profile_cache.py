@@ -0,0 +1,131 @@
+import asyncio
+
+from profile_cache import PROFILE_PROJECTION, ProfileCache
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length):
+        return self.docs
+
+
+class FakeUsers:
+    """Just enough of a Motor collection for ProfileCache."""
+
+    def __init__(self, docs):
+        self.docs = {doc['id']: doc for doc in docs}
+        self.reads = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def find_one(self, query, projection):
+        assert projection == PROFILE_PROJECTION
+        self.reads += 1
+        await self.release.wait()
+        doc = self.docs.get(query["id"])
+        return dict(doc) if doc is not None else None
+
+    def find(self, query, projection):
+        self.reads += 1
+        return FakeCursor([dict(self.docs[i]) for i in query["id"]["$in"] if i in self.docs])
+
+
+class FakeDb:
+    def __init__(self, *docs):
+        self.users = FakeUsers(docs)
+
+
+def profile(user_id, **fields):
+    return {"id": user_id, "name": user_id.title(), **fields}
+
+
+def test_concurrent_misses_share_one_read():
+    async def scenario():
+        db = FakeDb(profile("sara"))
+        cache = ProfileCache(db)
+        db.users.release.clear()
+        waiting = [asyncio.create_task(cache.get("sara")) for _ in range(5)]
+        await asyncio.sleep(0)
+        db.users.release.set()
+        results = await asyncio.gather(*waiting)
+        assert db.users.reads == 1
+        assert all(result == profile("sara") for result in results)
+        assert await cache.get("sara") == profile("sara")
+        assert db.users.reads == 1
+
+    asyncio.run(scenario())
+
+
+def test_callers_get_copies():
+    async def scenario():
+        cache = ProfileCache(FakeDb(profile("sara")))
+        (await cache.get("sara"))["name"] = "changed"
+        assert (await cache.get("sara"))["name"] == "Sara"
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_forces_a_fresh_read():
+    async def scenario():
+        db = FakeDb(profile("sara"))
+        cache = ProfileCache(db)
+        await cache.get("sara")
+        db.users.docs["sara"]["name"] = "Sara A."
+        cache.invalidate("sara")
+        assert (await cache.get("sara"))["name"] == "Sara A."
+        assert db.users.reads == 2
+
+    asyncio.run(scenario())
+
+
+def test_read_in_flight_during_invalidate_is_not_cached():
+    async def scenario():
+        db = FakeDb(profile("sara"))
+        cache = ProfileCache(db)
+        db.users.release.clear()
+        stale = asyncio.create_task(cache.get("sara"))
+        await asyncio.sleep(0)
+        cache.invalidate("sara")
+        db.users.release.set()
+        await stale
+        assert cache.stats()["size"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_entries_expire_after_ttl():
+    async def scenario():
+        db = FakeDb(profile("sara"))
+        cache = ProfileCache(db, ttl=0)
+        await cache.get("sara")
+        await cache.get("sara")
+        assert db.users.reads == 2
+
+    asyncio.run(scenario())
+
+
+def test_missing_users_are_not_cached():
+    async def scenario():
+        db = FakeDb()
+        cache = ProfileCache(db)
+        assert await cache.get("ghost") is None
+        assert await cache.get("ghost") is None
+        assert db.users.reads == 2
+
+    asyncio.run(scenario())
+
+
+def test_get_cards_reads_all_misses_at_once():
+    async def scenario():
+        db = FakeDb(profile("sara", bio="hidden"), profile("omar"), profile("mira"))
+        cache = ProfileCache(db)
+        await cache.get("sara")
+        cards = await cache.get_cards(["sara", "omar", "mira", "omar", "ghost"])
+        assert cards == {"sara": profile("sara"), "omar": profile("omar"), "mira": profile("mira")}
+        assert db.users.reads == 2
+        await cache.get_cards(["omar", "mira"])
+        assert db.users.reads == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,72 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from ranking import INTEREST_BYTES, CandidateBatch, interest_bits, rank_candidates, score_batch
+
+NOW = datetime(2025, 10, 21, 12, 0, tzinfo=timezone.utc)
+
+
+def candidate(user_id, interests=(), age=25, idle_hours=0, stored=True):
+    user = {"id": user_id, "interests": list(interests), "age": age,
+            "last_active": NOW - timedelta(hours=idle_hours)}
+    if stored:
+        user["interest_bits"] = interest_bits(interests)
+    return user
+
+
+def test_interest_bits_width_and_folding():
+    assert len(interest_bits([])) == INTEREST_BYTES
+    assert interest_bits([]) == bytes(INTEREST_BYTES)
+    assert interest_bits(["Travel "]) == interest_bits(["travel"])
+    assert interest_bits(["travel", "music"]) != interest_bits(["travel"])
+
+
+def test_shared_interests_rank_first():
+    me = candidate("me", ["travel", "music", "books"])
+    pool = [
+        candidate("none", ["chess"]),
+        candidate("all", ["books", "music", "travel"]),
+        candidate("one", ["travel"]),
+    ]
+    scores = score_batch(me, CandidateBatch(pool), now=NOW.timestamp())
+    assert list(np.argsort(-scores)) == [1, 2, 0]
+
+
+def test_age_and_recency_break_ties():
+    me = candidate("me", ["travel"], age=30)
+    batch = CandidateBatch([
+        candidate("far", ["travel"], age=45),
+        candidate("close", ["travel"], age=31),
+        candidate("idle", ["travel"], age=31, idle_hours=500),
+    ])
+    scores = score_batch(me, batch, now=NOW.timestamp())
+    assert scores[1] > scores[0]
+    assert scores[1] > scores[2]
+
+
+def test_documents_without_stored_bits_score_the_same():
+    me = candidate("me", ["travel", "music"])
+    stored = [candidate(f"u{i}", ["travel", "chess"][: i % 3], age=20 + i) for i in range(10)]
+    legacy = [candidate(f"u{i}", ["travel", "chess"][: i % 3], age=20 + i, stored=False) for i in range(10)]
+    now = NOW.timestamp()
+    assert np.allclose(score_batch(me, CandidateBatch(stored), now), score_batch(me, CandidateBatch(legacy), now))
+
+
+def test_last_active_as_epoch_milliseconds_or_missing():
+    millis = [{**candidate("a"), "last_active": int(NOW.timestamp() * 1000)}]
+    dates = [candidate("a")]
+    assert np.allclose(CandidateBatch(millis).last_active, CandidateBatch(dates).last_active)
+    assert CandidateBatch([{**candidate("b"), "last_active": None}]).last_active[0] == 0.0
+
+
+def test_rank_candidates_returns_the_best_limit_in_order():
+    me = candidate("me", ["travel", "music"])
+    pool = [candidate(f"u{i}", ["travel", "music"][: i % 3], age=25 + i % 7) for i in range(50)]
+    ranked = rank_candidates(me, pool, 10)
+    assert len(ranked) == 10
+    scores = score_batch(me, CandidateBatch(ranked))
+    assert list(scores) == sorted(scores, reverse=True)
+    assert min(scores) >= np.sort(score_batch(me, CandidateBatch(pool)))[-10]
+    assert rank_candidates(me, [], 10) == []
+    assert len(rank_candidates(me, pool[:3], 10)) == 3
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+from fastapi import WebSocketDisconnect
+
+from realtime import Broker, ConnectionHub, InMemoryBroker
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed_with = None
+        self.incoming = asyncio.Queue()
+        self.sending = asyncio.Event()
+        self.sending.set()
+
+    async def send_json(self, event):
+        await self.sending.wait()
+        self.sent.append(event)
+
+    async def receive_json(self):
+        message = await self.incoming.get()
+        if message is None:
+            raise WebSocketDisconnect()
+        return message
+
+    async def close(self, code=1000):
+        if self.closed_with is None:
+            self.closed_with = code
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_broker_is_abstract():
+    with pytest.raises(TypeError):
+        Broker()
+
+
+def test_events_fan_out_to_every_socket_of_the_user():
+    async def scenario():
+        hub = ConnectionHub(InMemoryBroker())
+        await hub.start()
+        sockets = {"sara-phone": FakeWebSocket(), "sara-web": FakeWebSocket(), "omar": FakeWebSocket()}
+        tasks = [
+            asyncio.create_task(hub.serve(socket, name.split("-")[0])) for name, socket in sockets.items()
+        ]
+        await settle()
+        assert hub.connection_count() == 3
+
+        await hub.publish("sara", "match", {"match_id": "m1"})
+        await settle()
+        event = {"type": "match", "data": {"match_id": "m1"}}
+        assert sockets["sara-phone"].sent == [event]
+        assert sockets["sara-web"].sent == [event]
+        assert sockets["omar"].sent == []
+
+        for socket in sockets.values():
+            socket.incoming.put_nowait(None)
+        await asyncio.gather(*tasks)
+        assert hub.connection_count() == 0
+        await hub.stop()
+
+    asyncio.run(scenario())
+
+
+def test_client_ping_gets_a_pong():
+    async def scenario():
+        hub = ConnectionHub(InMemoryBroker())
+        socket = FakeWebSocket()
+        task = asyncio.create_task(hub.serve(socket, "sara"))
+        socket.incoming.put_nowait({"type": "ping"})
+        await settle()
+        assert socket.sent == [{"type": "pong"}]
+        socket.incoming.put_nowait(None)
+        await task
+
+    asyncio.run(scenario())
+
+
+def test_slow_client_is_disconnected_when_its_queue_fills():
+    async def scenario():
+        hub = ConnectionHub(InMemoryBroker(), queue_size=2)
+        await hub.start()
+        slow, fast = FakeWebSocket(), FakeWebSocket()
+        slow.sending.clear()
+        tasks = [asyncio.create_task(hub.serve(slow, "sara")), asyncio.create_task(hub.serve(fast, "sara"))]
+        await settle()
+
+        # The slow socket holds one event in send_json and two queued; the fourth overflows
+        for i in range(4):
+            await hub.publish("sara", "message", {"n": i})
+            await settle()
+        await asyncio.wait_for(tasks[0], timeout=1)
+        assert slow.closed_with == 1013
+        assert hub.connection_count() == 1
+        await settle()
+        assert [event["data"]["n"] for event in fast.sent] == [0, 1, 2, 3]
+
+        fast.incoming.put_nowait(None)
+        await tasks[1]
+
+    asyncio.run(scenario())
+
+
+def test_silent_client_is_dropped_after_two_heartbeats():
+    async def scenario():
+        hub = ConnectionHub(InMemoryBroker(), heartbeat_interval=0.02)
+        silent = FakeWebSocket()
+        await asyncio.wait_for(hub.serve(silent, "sara"), timeout=1)
+        assert silent.closed_with == 1001
+        assert {"type": "ping"} in silent.sent
+        assert hub.connection_count() == 0
+
+    asyncio.run(scenario())
+
+
+def test_active_client_survives_heartbeats():
+    async def scenario():
+        hub = ConnectionHub(InMemoryBroker(), heartbeat_interval=0.02)
+        socket = FakeWebSocket()
+        task = asyncio.create_task(hub.serve(socket, "sara"))
+        for _ in range(6):
+            await asyncio.sleep(0.02)
+            socket.incoming.put_nowait({"type": "pong"})
+        assert not task.done()
+        socket.incoming.put_nowait(None)
+        await task
+        assert socket.closed_with == 1000
+
+    asyncio.run(scenario())
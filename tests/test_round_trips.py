@@ -0,0 +1,100 @@
+"""
+Round-trip budgets for the hot endpoints, counted by mongo_monitor through
+the X-Mongo-Round-Trips debug header. Needs a MongoDB at MONGO_URL (default
+mongodb://localhost:27017); the tests are skipped when none answers. Each
+run uses, and then drops, its own database.
+"""
+import os
+import uuid
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from mongo_monitor import assert_max_round_trips
+
+MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
+
+
+@pytest.fixture(scope="module")
+def client():
+    probe = MongoClient(MONGO_URL, serverSelectionTimeoutMS=1000)
+    try:
+        probe.admin.command("ping")
+    except PyMongoError:
+        pytest.skip(f"no MongoDB at {MONGO_URL}")
+
+    db_name = f"pizoo_test_{uuid.uuid4().hex[:8]}"
+    os.environ.update({
+        "MONGO_URL": MONGO_URL,
+        "DB_NAME": db_name,
+        "MONGO_DEBUG_HEADERS": "true",
+        "MONGO_MIN_POOL_SIZE": "0",
+        "BCRYPT_ROUNDS": "4",
+    })
+    from fastapi.testclient import TestClient
+    import server
+
+    try:
+        with TestClient(server.app) as test_client:
+            yield test_client
+    finally:
+        probe.drop_database(db_name)
+        probe.close()
+
+
+def register(client, name: str) -> dict:
+    response = client.post("/api/auth/register", json={
+        "email": f"{name}-{uuid.uuid4().hex[:6]}@example.com",
+        "password": "secret123",
+        "name": name.title(),
+        "age": 27,
+        "gender": "female",
+        "location": "Cairo, Egypt",
+        "interests": ["travel", "music"],
+    })
+    assert response.status_code == 200, response.text
+    body = response.json()
+    return {"id": body["user"]["id"], "headers": {"Authorization": f"Bearer {body['token']}"}}
+
+
+def swipe(client, user: dict, target: dict, action: str = "like"):
+    return client.post("/api/swipes", json={"to_user_id": target["id"], "action": action}, headers=user["headers"])
+
+
+def test_create_swipe(client):
+    sara, omar, mira = register(client, "sara"), register(client, "omar"), register(client, "mira")
+
+    response = swipe(client, sara, omar, "pass")
+    assert response.status_code == 200
+    assert_max_round_trips(response, 3)
+
+    response = swipe(client, sara, mira)
+    assert response.json()["is_match"] is False
+    assert_max_round_trips(response, 4)
+
+    response = swipe(client, mira, sara)
+    assert response.json()["is_match"] is True
+    assert_max_round_trips(response, 5)
+
+
+def test_get_likes_me(client):
+    sara = register(client, "sara")
+    for name in ("omar", "mira", "layla"):
+        swipe(client, register(client, name), sara)
+
+    response = client.get("/api/swipes/likes-me", headers=sara["headers"])
+    assert len(response.json()) == 3
+    assert_max_round_trips(response, 2)
+
+
+def test_get_matches(client):
+    sara = register(client, "sara")
+    for name in ("omar", "mira", "layla"):
+        other = register(client, name)
+        swipe(client, sara, other)
+        swipe(client, other, sara)
+
+    response = client.get("/api/matches", headers=sara["headers"])
+    assert len(response.json()) == 3
+    assert_max_round_trips(response, 2)
@@ -0,0 +1,51 @@
+from seen import FILTER_BITS, HASH_COUNT, WORD_BITS, SeenSet, _bit_positions, _bit_update
+
+
+def apply_update(update: dict) -> dict:
+    # What MongoDB's $bit/or leaves in the stored document
+    words = {}
+    for key, op in update.items():
+        index = key.split(".", 1)[1]
+        words[index] = words.get(index, 0) | int(op["or"])
+    return words
+
+
+def test_bit_positions_are_stable():
+    # Stored filters depend on these; changing the hash means rebuilding every filter
+    assert _bit_positions("user-1") == [326870, 147991, 493400, 314521]
+
+
+def test_bit_positions_are_in_range():
+    for i in range(1000):
+        positions = _bit_positions(f"user-{i}")
+        assert len(positions) == HASH_COUNT
+        assert all(0 <= bit < FILTER_BITS for bit in positions)
+
+
+def test_bit_update_sets_one_bit_per_position():
+    update = _bit_update(["user-1"])
+    assert sorted(update) == sorted(f"words.{bit // WORD_BITS}" for bit in _bit_positions("user-1"))
+    assert all(bin(int(op["or"])).count("1") == 1 for op in update.values())
+
+
+def test_bit_update_merges_bits_in_the_same_word():
+    ids = [f"user-{i}" for i in range(5000)]
+    update = _bit_update(ids)
+    assert sum(bin(int(op["or"])).count("1") for op in update.values()) == len(
+        {bit for target_id in ids for bit in _bit_positions(target_id)}
+    )
+
+
+def test_seen_set_contains_recorded_ids():
+    recorded = [f"user-{i}" for i in range(200)]
+    seen = SeenSet({"words": apply_update(_bit_update(recorded)), "cursor": "user-5"})
+    assert seen.cursor == "user-5"
+    assert all(seen.might_contain(target_id) for target_id in recorded)
+    false_positives = sum(seen.might_contain(f"other-{i}") for i in range(1000))
+    assert false_positives < 5
+
+
+def test_empty_seen_set():
+    seen = SeenSet()
+    assert seen.cursor == ""
+    assert not seen.might_contain("user-1")
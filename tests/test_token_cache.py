@@ -0,0 +1,50 @@
+import time
+
+from token_cache import TokenCache
+
+
+def test_put_then_get():
+    cache = TokenCache()
+    cache.put("token", "user-1", time.time() + 60)
+    assert cache.get("token") == "user-1"
+    assert cache.get("other") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_expired_entries_are_dropped():
+    cache = TokenCache()
+    cache.put("token", "user-1", time.time() - 1)
+    assert cache.get("token") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_revoked_token_is_evicted_and_denied_until_it_expires():
+    cache = TokenCache()
+    cache.put("token", "user-1", time.time() + 60)
+    cache.revoke("token", time.time() + 60)
+    assert cache.is_revoked("token")
+    assert cache.get("token") is None
+
+    cache.revoke("stale", time.time() - 1)
+    assert not cache.is_revoked("stale")
+
+
+def test_revocations_are_pruned_once_expired():
+    cache = TokenCache(maxsize=2)
+    cache.revoke("a", time.time() - 1)
+    cache.revoke("b", time.time() - 1)
+    cache.revoke("c", time.time() + 60)
+    assert cache.stats()["revoked"] == 1
+    assert cache.is_revoked("c")
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TokenCache(maxsize=2)
+    expires_at = time.time() + 60
+    cache.put("a", "user-a", expires_at)
+    cache.put("b", "user-b", expires_at)
+    cache.get("a")
+    cache.put("c", "user-c", expires_at)
+    assert cache.get("b") is None
+    assert cache.get("a") == "user-a"
+    assert cache.get("c") == "user-c"